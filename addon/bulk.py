@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from aqt import mw
+
+from . import detector
+from . import file_source
+from . import importer
+from . import parsers
+
+# Characters of each bulk file kept in memory for detection and previews.
+BULK_SAMPLE_CHARS = 64 * 1024
+# Prepared batches each file's producer may run ahead of the writer.
+PIPELINE_QUEUE_SIZE = 4
+
+
+def analyze_file(path, delimiter=None):
+    # Pure per-file analysis, safe to run on a worker thread. Only a prefix of
+    # the file is kept; the row count is taken by streaming the file, which is
+    # streamed again at import time.
+    source_file = file_source.open_source(path)
+    sample = source_file.read_prefix(BULK_SAMPLE_CHARS)
+    data_sample = sample
+    if len(sample) >= BULK_SAMPLE_CHARS:
+        data_sample = sample[:sample.rfind("\n") + 1] or sample
+    data_sample = detector.strip_directive_lines(data_sample)
+    if delimiter is None:
+        delimiter = detector.sniff_delimiter(data_sample)
+    rows_count = parsers.count_rows(
+        detector.iter_data_lines(source_file.iter_lines()), delimiter
+    )
+    source = detector.analyze(data_sample, delimiter, exact=True)
+    return sample, source.with_exact_row_count(rows_count)
+
+
+def analyze_files(paths, on_result, on_done=None):
+    # Analyse files one at a time on a background thread and call
+    # on_result(index, future) on the main thread as each one finishes, then
+    # on_done(). A single worker: detection is mostly pure-Python decoding and
+    # csv parsing that holds the GIL, so more threads would not finish sooner
+    # and would only compete with the UI. Without a task manager (older Anki,
+    # tests) everything runs inline.
+    paths = list(paths)
+    if getattr(mw, "taskman", None) is None:
+        for idx, path in enumerate(paths):
+            on_result(idx, _completed(analyze_file, path))
+        if on_done:
+            on_done()
+        return
+
+    def run():
+        for idx, path in enumerate(paths):
+            future = _completed(analyze_file, path)
+            importer.run_on_main(lambda i=idx, f=future: on_result(i, f))
+        if on_done:
+            importer.run_on_main(on_done)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+_DONE = object()
+
+
+class _Producer:
+    # Parses and transforms one job's rows on the pipeline thread into a
+    # bounded queue, so it cannot run arbitrarily far ahead of the writer.
+    def __init__(self, job):
+        self.job = job
+        self.stop = threading.Event()
+        self.queue = queue.Queue(PIPELINE_QUEUE_SIZE)
+
+    def run(self):
+        try:
+            for batch in importer.iter_prepared_batches(self.job):
+                if not self._put(batch):
+                    return
+            self._put(_DONE)
+        except BaseException as e:
+            self._put(e)
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def batches(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # The writer finished or gave up on this file; free the worker.
+            self.stop.set()
+
+
+class ImportPipeline:
+    # Bulk import: one background thread reads, parses and transforms the
+    # files in order while a single caller writes them to the collection, e.g.
+    #   for i, job in enumerate(jobs):
+    #       importer.run_import_job(job, batches=pipeline.batches(i))
+    # close() must be called once the writer is finished or gives up.
+    #
+    # The gain is overlap, not parallelism: csv parsing and HTML escaping are
+    # pure Python and hold the GIL, so more producer threads do not help,
+    # while Anki's backend releases the GIL during writes, so parsing the
+    # next batches while the current one is written hides most of the parse
+    # time.
+    def __init__(self, jobs):
+        self._producers = [_Producer(job) for job in jobs]
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # A producer returns once its file is fully queued or abandoned.
+        for producer in self._producers:
+            producer.run()
+
+    def batches(self, index):
+        return self._producers[index].batches()
+
+    def close(self):
+        for producer in self._producers:
+            producer.stop.set()
+
+
+def _completed(func, *args):
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
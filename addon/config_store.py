@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+# Write-behind view of the add-on config. The config is read from Anki once
+# and then edited in memory; changes only mark the store dirty, and flush()
+# writes everything with a single writeConfig. The dialog flushes on a short
+# timer and when it closes, so typing in a text box does not serialize and
+# rewrite the whole config (which may hold the saved history) per keystroke.
+
+
+class ConfigStore:
+    def __init__(self, addon_manager, name):
+        self._manager = addon_manager
+        self._name = name
+        self._config = None
+        self._dirty = False
+
+    def get(self) -> dict:
+        if self._config is None:
+            self._config = self._manager.getConfig(self._name) or {}
+        return self._config
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def update(self, values):
+        self.get().update(values)
+        self._dirty = True
+
+    def mark_dirty(self):
+        # For callers that edited get() in place.
+        self.get()
+        self._dirty = True
+
+    def flush(self) -> bool:
+        if not self._dirty:
+            return False
+        self._manager.writeConfig(self._name, self._config)
+        self._dirty = False
+        return True
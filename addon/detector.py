@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 
 import csv
-import io
+import hashlib
+from array import array
 import re
+import threading
+from collections import OrderedDict
 
 from aqt import mw
 
+from . import parsers
+
 
 def extract_directives(content: str) -> dict:
     directives = {}
@@ -21,15 +26,55 @@ def extract_directives(content: str) -> dict:
 
 
 def strip_directive_lines(content: str) -> str:
-    out = []
+    return "\n".join(
+        line.rstrip("\n") for line in iter_data_lines(iter_lines(content))
+    )
+
+
+_LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+# Characters str.splitlines() also breaks on but iter_lines() must not.
+_OTHER_BREAKS_RE = re.compile("[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+LINE_CHUNK_SIZE = 256 * 1024
+
+
+def iter_lines(content: str):
+    # Lazily split text into "\n"-terminated lines without copying the whole
+    # buffer, normalizing \r\n and \r line breaks. Works through the text in
+    # chunks cut after a "\n" so most lines come from a C-level splitlines().
+    start = 0
+    length = len(content)
+    while start < length:
+        end = content.find("\n", start + LINE_CHUNK_SIZE)
+        end = length if end < 0 else end + 1
+        chunk = content[start:end]
+        if _OTHER_BREAKS_RE.search(chunk):
+            yield from _iter_lines_exact(chunk)
+        else:
+            if "\r" in chunk:
+                chunk = chunk.replace("\r\n", "\n").replace("\r", "\n")
+            yield from chunk.splitlines(keepends=True)
+        start = end
+
+
+def _iter_lines_exact(content: str):
+    start = 0
+    for m in _LINE_BREAK_RE.finditer(content):
+        yield content[start:m.start()] + "\n"
+        start = m.end()
+    if start < len(content):
+        yield content[start:]
+
+
+def iter_data_lines(lines):
+    # Skip leading directive (#...) and blank lines, then pass everything through.
     skipping = True
-    for line in content.splitlines():
-        if skipping and line.strip().startswith("#"):
-            continue
-        skipping = skipping and not line.strip()
-        if not skipping:
-            out.append(line)
-    return "\n".join(out)
+    for line in lines:
+        if skipping:
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            skipping = False
+        yield line
 
 
 def normalize_name(s: str) -> str:
@@ -60,17 +105,380 @@ def find_model_index_by_name(model_infos, name: str):
     return None
 
 
-def detect_csv_format(content: str):
+def sniff_delimiter(content: str):
     sample = content[:2048]
     try:
         sniffer = csv.Sniffer()
         dialect = sniffer.sniff(sample, delimiters=",;\t|")
-        delimiter = dialect.delimiter
+        return dialect.delimiter
     except Exception:
-        delimiter = fallback_delimiter_detection(sample)
-    reader = csv.reader(io.StringIO(content), delimiter=delimiter)
-    rows = sum(1 for _ in reader)
-    return delimiter, rows
+        return fallback_delimiter_detection(sample)
+
+
+class ColumnTable:
+    # Parsed rows stored column-wise: all cell text lives in one shared buffer
+    # and each column keeps array offsets into it (-1 where a row is too
+    # short), instead of a Python list per row.
+    def __init__(self, rows=()):
+        self._buffer = ""
+        self._pending = []
+        self._size = 0
+        self.starts = []
+        self.ends = []
+        self.widths = array("l")
+        for row in rows:
+            self.append_row(row)
+
+    def append_row(self, row):
+        row_idx = len(self.widths)
+        for col_idx, cell in enumerate(row):
+            if col_idx == len(self.starts):
+                self.starts.append(array("q", [-1]) * row_idx)
+                self.ends.append(array("q", [-1]) * row_idx)
+            self.starts[col_idx].append(self._size)
+            self._size += len(cell)
+            self.ends[col_idx].append(self._size)
+            self._pending.append(cell)
+        for col_idx in range(len(row), len(self.starts)):
+            self.starts[col_idx].append(-1)
+            self.ends[col_idx].append(-1)
+        self.widths.append(len(row))
+
+    @property
+    def buffer(self) -> str:
+        if self._pending:
+            self._buffer += "".join(self._pending)
+            self._pending = []
+        return self._buffer
+
+    @property
+    def row_count(self) -> int:
+        return len(self.widths)
+
+    @property
+    def column_count(self) -> int:
+        return len(self.starts)
+
+    def __len__(self):
+        return len(self.widths)
+
+    def cell(self, row_idx, col_idx):
+        if col_idx >= len(self.starts):
+            return None
+        start = self.starts[col_idx][row_idx]
+        if start < 0:
+            return None
+        return self.buffer[start:self.ends[col_idx][row_idx]]
+
+    def row(self, row_idx):
+        buf = self.buffer
+        return [
+            buf[self.starts[c][row_idx]:self.ends[c][row_idx]]
+            for c in range(self.widths[row_idx])
+        ]
+
+
+def guess_header(table) -> bool:
+    # csv.Sniffer.has_header's vote, computed per column on the parsed table:
+    # a column votes "header" when its first cell does not match the type
+    # (number) or fixed length that the cells below it agree on.
+    if table.row_count < 2:
+        return False
+    width = table.widths[0]
+    header = table.row(0)
+    same_width = [
+        r for r in range(1, min(table.row_count, 21)) if table.widths[r] == width
+    ]
+    votes = 0
+    for col_idx in range(width):
+        col_type = None
+        consistent = True
+        for r in same_width:
+            value = table.cell(r, col_idx)
+            this_type = len(value)
+            for kind in (int, float, complex):
+                try:
+                    kind(value)
+                    this_type = kind
+                    break
+                except (ValueError, OverflowError):
+                    pass
+            if col_type is None:
+                col_type = this_type
+            elif this_type != col_type:
+                consistent = False
+                break
+        if not consistent or col_type is None:
+            continue
+        if isinstance(col_type, int):
+            votes += 1 if len(header[col_idx]) != col_type else -1
+        else:
+            try:
+                col_type(header[col_idx])
+                votes -= 1
+            except (ValueError, TypeError):
+                votes += 1
+    return votes > 0
+
+
+class ParsedSource:
+    # Everything the dialog and note-type detection need to know about one
+    # piece of CSV content, gathered in a single parse. table holds the first
+    # non-empty rows (header candidate included) in columnar form.
+    def __init__(self, delimiter, row_count, table, has_header_guess, has_cloze, row_count_exact=True):
+        self.delimiter = delimiter
+        self.row_count = row_count
+        self.row_count_exact = row_count_exact
+        self.table = table
+        self.has_header_guess = has_header_guess
+        self.has_cloze = has_cloze
+
+    def with_exact_row_count(self, row_count: int):
+        # Copy for an analysis of a sample whose full row count was counted
+        # separately; cached analyses are shared and must not be changed.
+        return ParsedSource(
+            self.delimiter,
+            row_count,
+            self.table,
+            self.has_header_guess,
+            self.has_cloze,
+        )
+
+    def set_exact_row_count(self, row_count: int):
+        # Refine an estimated analysis once the full count is known.
+        self.row_count = row_count
+        self.row_count_exact = True
+
+
+def format_row_count(source) -> str:
+    if source is None:
+        return "0"
+    if source.row_count_exact:
+        return str(source.row_count)
+    return f"~{source.row_count}"
+
+
+# Recent analyses keyed by (content digest, delimiter, preview_rows), so
+# re-analysing unchanged text on debounced edits, tab switches and bulk
+# table refreshes costs one hash instead of a full parse.
+MAX_CACHED_ANALYSES = 16
+
+# Above this size analyze() only parses a block at each end of the content
+# and extrapolates the row count; count_rows() gives the exact figure.
+ESTIMATE_ROWS_ABOVE = 1024 * 1024
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+_ANALYSIS_CACHE = OrderedDict()
+# Bulk file analysis runs on worker threads.
+_cache_lock = threading.Lock()
+
+
+def content_digest(content: str) -> bytes:
+    return hashlib.blake2b(
+        content.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+
+
+def analyze(content: str, delimiter: str | None = None, preview_rows: int = 21, exact: bool | None = None) -> ParsedSource:
+    # content is expected without directive lines (see strip_directive_lines).
+    # The returned object is shared between callers and must not be mutated
+    # (apart from set_exact_row_count).
+    if delimiter is None:
+        delimiter = sniff_delimiter(content)
+    if exact is None:
+        exact = len(content) <= ESTIMATE_ROWS_ABOVE
+
+    key = (content_digest(content), delimiter, preview_rows, exact)
+    with _cache_lock:
+        source = _ANALYSIS_CACHE.get(key)
+        if source is not None:
+            _ANALYSIS_CACHE.move_to_end(key)
+            return source
+
+    if exact:
+        source = _analyze(content, delimiter, preview_rows)
+    else:
+        source = _analyze_sampled(content, delimiter, preview_rows)
+    with _cache_lock:
+        _ANALYSIS_CACHE[key] = source
+        while len(_ANALYSIS_CACHE) > MAX_CACHED_ANALYSES:
+            _ANALYSIS_CACHE.popitem(last=False)
+    return source
+
+
+def clear_cache():
+    with _cache_lock:
+        _ANALYSIS_CACHE.clear()
+
+
+def _analyze(content: str, delimiter: str, preview_rows: int) -> ParsedSource:
+    row_count = 0
+    table = ColumnTable()
+    for row in parsers.iter_rows(iter_lines(content), delimiter):
+        row_count += 1
+        if not any(c.strip() for c in row):
+            continue
+        if table.row_count < preview_rows:
+            table.append_row(row)
+
+    return ParsedSource(
+        delimiter,
+        row_count,
+        table,
+        guess_header(table),
+        detect_cloze_in_text(content),
+    )
+
+
+def _analyze_sampled(content: str, delimiter: str, preview_rows: int) -> ParsedSource:
+    # Parse whole lines from the first and last SAMPLE_BLOCK_SIZE characters
+    # and scale the row count by the share of the content they cover.
+    head_end = content.rfind("\n", 0, SAMPLE_BLOCK_SIZE) + 1
+    tail_start = content.find("\n", len(content) - SAMPLE_BLOCK_SIZE) + 1
+    if head_end <= 0 or tail_start <= head_end:
+        return _analyze(content, delimiter, preview_rows)
+
+    head = _analyze(content[:head_end], delimiter, preview_rows)
+    tail = _analyze(content[tail_start:], delimiter, 0)
+    sampled_chars = head_end + len(content) - tail_start
+    estimate = round((head.row_count + tail.row_count) * len(content) / sampled_chars)
+
+    return ParsedSource(
+        delimiter,
+        max(estimate, head.row_count + tail.row_count),
+        head.table,
+        head.has_header_guess,
+        detect_cloze_in_text(content),
+        row_count_exact=False,
+    )
+
+
+def count_rows(content: str, delimiter: str, is_cancelled=None) -> int:
+    # Exact row count for content analyze() only estimated; safe to run off
+    # the main thread. is_cancelled() is polled while counting; once it is
+    # true the count stops early and its result is meaningless.
+    lines = iter_lines(content)
+    if is_cancelled is not None:
+        lines = _until_cancelled(lines, is_cancelled)
+    return parsers.count_rows(lines, delimiter, text=content)
+
+
+def _until_cancelled(lines, is_cancelled, every=4096):
+    for i, line in enumerate(lines):
+        if i % every == 0 and is_cancelled():
+            return
+        yield line
+
+
+def suggest_mapping(source, field_names, has_header=None) -> dict:
+    # Field name -> column index for header cells that name a field.
+    if source is None or not source.table.row_count:
+        return {}
+    if has_header is None:
+        has_header = source.has_header_guess
+    if not has_header:
+        return {}
+    columns = {}
+    for col_idx, cell in enumerate(source.table.row(0)):
+        columns.setdefault(normalize_name(cell), col_idx)
+    columns.pop("", None)
+    return {
+        name: columns[normalize_name(name)]
+        for name in field_names
+        if normalize_name(name) in columns
+    }
+
+
+# Clipboard validation never looks further than this into the text.
+VALIDATION_PREFIX_CHARS = 64 * 1024
+
+
+# Delimiters tried when none is given.
+CANDIDATE_DELIMITERS = (",", "\t", ";", "|")
+
+
+def _bounded_prefix(text: str, max_chars: int) -> str:
+    # The first max_chars of text, cut back to a whole line when longer.
+    if len(text) <= max_chars:
+        return text.strip()
+    prefix = text[:max_chars]
+    cut = prefix.rfind("\n")
+    if cut > 0:
+        prefix = prefix[:cut + 1]
+    return prefix.lstrip()
+
+
+# csv reader states used by _scan_quoted_line.
+_FIELD_START, _IN_FIELD, _QUOTED, _QUOTE_IN_QUOTED = range(4)
+
+
+def _scan_quoted_line(line: str, delimiter: str, carry):
+    # Follows the csv module's reader states over one line. carry is None at
+    # the start of a row, or (split, filled) for a row whose quoted value ran
+    # past the previous line. Returns (found, carry): found when the row has
+    # a delimiter between fields and a cell that is not blank; carry when a
+    # quoted value runs past this line.
+    if carry is None:
+        state, split, filled = _FIELD_START, False, False
+    else:
+        state, (split, filled) = _QUOTED, carry
+    for c in line:
+        if state == _QUOTED:
+            if c == '"':
+                state = _QUOTE_IN_QUOTED
+            elif not c.isspace():
+                filled = True
+        elif c == delimiter:
+            split = True
+            state = _FIELD_START
+        elif c == "\n":
+            break
+        elif state == _FIELD_START and c == '"':
+            state = _QUOTED
+        elif state == _QUOTE_IN_QUOTED and c == '"':
+            # A doubled quote: a literal '"' in the value.
+            state = _QUOTED
+            filled = True
+        else:
+            state = _IN_FIELD
+            filled = filled or not c.isspace()
+        if split and filled:
+            return True, None
+    if state == _QUOTED:
+        return False, (split, filled)
+    return False, None
+
+
+def has_multi_column_row(text: str, delimiters=CANDIDATE_DELIMITERS, max_chars: int = VALIDATION_PREFIX_CHARS) -> bool:
+    # True as soon as a row in the start of text has more than one field for
+    # any of the delimiters, i.e. an unquoted delimiter, and is not blank:
+    # rows like ",," do not count. One pass over the lines checks every
+    # delimiter; only lines containing a quote, or continuing a quoted
+    # value, need the per-delimiter quote state. Safe off the main thread.
+    carries = dict.fromkeys(delimiters)
+    for line in iter_lines(_bounded_prefix(text, max_chars)):
+        quoted = '"' in line
+        for delimiter in delimiters:
+            if quoted or carries[delimiter] is not None:
+                found, carries[delimiter] = _scan_quoted_line(line, delimiter, carries[delimiter])
+                if found:
+                    return True
+            elif delimiter in line and line.replace(delimiter, "").strip():
+                return True
+    return False
+
+
+def looks_like_csv(text: str, delimiter: str | None = None, max_chars: int = VALIDATION_PREFIX_CHARS) -> bool:
+    # Directive lines aside, does the start of text have a row with more than
+    # one column? Without a delimiter every candidate is tried at once.
+    content = strip_directive_lines(_bounded_prefix(text, max_chars))
+    delimiters = (delimiter,) if delimiter else CANDIDATE_DELIMITERS
+    return has_multi_column_row(content, delimiters, max_chars)
+
+
+def detect_csv_format(content: str):
+    source = analyze(content, exact=True)
+    return source.delimiter, source.row_count
 
 
 def fallback_delimiter_detection(sample: str):
@@ -108,8 +516,19 @@ def get_delimiter_name(delimiter: str):
 
 
 def auto_pick_note_type(content: str, delimiter: str, model_infos, header_check):
+    try:
+        source = analyze(content, delimiter)
+    except Exception:
+        source = None
+    return pick_note_type(source, model_infos, header_check)
+
+
+def pick_note_type(source, model_infos, header_check):
+    if source is None:
+        return None, None, None
+
     # Prefer Cloze if we detect cloze patterns
-    if detect_cloze_in_text(content):
+    if source.has_cloze:
         cloze_idx = find_model_index_by_name(model_infos, "Cloze")
         if cloze_idx is not None:
             try:
@@ -122,28 +541,16 @@ def auto_pick_note_type(content: str, delimiter: str, model_infos, header_check)
             except Exception:
                 pass  # fall through
 
-    try:
-        reader = csv.reader(io.StringIO(content), delimiter=delimiter)
-        rows = [r for r in reader if any(c.strip() for c in r)]
-    except Exception:
-        rows = []
-
-    if not rows:
+    table = source.table
+    if not table.row_count:
         return None, None, None
 
     # Header guess
     header_hint = header_check.isChecked()
-    try:
-        sniffer = csv.Sniffer()
-        has_header_guess = sniffer.has_header(content[:2048])
-    except Exception:
-        has_header_guess = False
-    has_header = header_hint or has_header_guess
-
-    header = [c.strip() for c in rows[0]] if has_header else None
-    sample_rows = rows[1:21] if has_header else rows[:20]
-    col_counts = [len(r) for r in sample_rows] or [len(rows[0])]
-    observed_cols = max(col_counts) if col_counts else len(rows[0])
+    has_header = header_hint or source.has_header_guess
+    header = [c.strip() for c in table.row(0)] if has_header else None
+    col_counts = table.widths[1:21] if has_header else table.widths[:20]
+    observed_cols = max(col_counts) if col_counts else table.widths[0]
 
     if not model_infos:
         return None, None, None
@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import os
-import csv
-import io
+import threading
+from collections import OrderedDict
 
 from aqt import mw
+from aqt.utils import showWarning
 from aqt.qt import (
     QApplication,
     QCheckBox,
@@ -19,32 +20,40 @@ from aqt.qt import (
     Qt,
     QVBoxLayout,
     QTreeWidgetItem,
-    QPushButton,
-    QHBoxLayout,
-    QTableWidget,
-    QTableWidgetItem,
     QHeaderView,
     QComboBox,
     QLineEdit,
     QFormLayout,
     QGroupBox,
     QProgressBar,
+    QProgressDialog,
     QCompleter,
-    QWidget,
 )
 
 from . import anki_helpers
+from . import bulk
+from . import config_store
 from . import detector
+from . import file_source
+from . import history_store
 from . import importer
 from . import ui
 
 PROFILE_KEY_LAST_DIR = "csv_import_plus_last_dir"
 CONFIG_KEY_CONFIRM_CLIPBOARD_QUICK_IMPORT = "confirm_clipboard_quick_import"
 CONFIG_KEY_ALLOW_ANY_CLIPBOARD_QUICK_IMPORT = "allow_any_clipboard_quick_import"
+# Config changes are written this long after the last one.
+CONFIG_SAVE_DELAY_MS = 500
+# Clipboard CSV verdicts remembered per clipboard content.
+CLIPBOARD_VERDICT_CACHE_SIZE = 32
 
 
 class CSVImportPlusDialog(QDialog):
     def __init__(self, parent=None):
+        # Set up the history before anything reads the config: it moves
+        # history older versions saved in the config out to its own file,
+        # and the config store must not cache a copy that still holds it.
+        history_store.get_store()
         super().__init__(parent)
         self.deck_infos = []
         self.model_infos = []
@@ -54,9 +63,23 @@ class CSVImportPlusDialog(QDialog):
         self.locked_deck_name = None
         self.confirm_clipboard_quick_import = False
         self.allow_any_clipboard_quick_import = False
+        self._import_running = False
+        self._import_cancel = threading.Event()
+        self._close_after_import = False
+        self._import_progress_dialog = None
+        self._parsed_source = None
+        self._row_count_generation = 0
+        self._bulk_generation = 0
+        self._bulk_settings = None
+        self._clipboard_verdicts = OrderedDict()
+        self._clipboard_check_generation = 0
         self._analysis_timer = QTimer(self)
         self._analysis_timer.setSingleShot(True)
         self._analysis_timer.timeout.connect(self.on_content_changed)
+        self._config_store = config_store.ConfigStore(mw.addonManager, self._get_config_name())
+        self._config_save_timer = QTimer(self)
+        self._config_save_timer.setSingleShot(True)
+        self._config_save_timer.timeout.connect(self.flush_config)
         self.setup_ui()
         self.refresh_decks()
         self.model_infos = self.get_model_infos()
@@ -84,6 +107,13 @@ class CSVImportPlusDialog(QDialog):
         self.setAcceptDrops(True)
 
     def closeEvent(self, event):
+        if self._import_running:
+            # Let the background import roll back before the dialog goes away.
+            self._close_after_import = True
+            self.cancel_import()
+            event.ignore()
+            return
+        self.flush_config()
         self.deleteLater()
         event.accept()
 
@@ -142,15 +172,12 @@ class CSVImportPlusDialog(QDialog):
     def _get_config_name(self):
         return mw.addonManager.addonFromModule(__name__)
 
-    def load_config(self):
-        config = mw.addonManager.getConfig(self._get_config_name()) or {}
+    def done(self, result):
+        self.flush_config()
+        super().done(result)
 
-        if not getattr(mw, 'csv_import_plus_history_loaded', False):
-            if config.get("remember_history", False):
-                mw.csv_import_plus_history = config.get("saved_history", [])
-            else:
-                mw.csv_import_plus_history = []
-            mw.csv_import_plus_history_loaded = True
+    def load_config(self):
+        config = self._config_store.get()
 
         self.confirm_clipboard_quick_import = config.get(
             CONFIG_KEY_CONFIRM_CLIPBOARD_QUICK_IMPORT, False
@@ -193,30 +220,40 @@ class CSVImportPlusDialog(QDialog):
         self.update_quick_clipboard_button_state()
 
     def save_config(self):
-        config = mw.addonManager.getConfig(self._get_config_name()) or {}
-        self.advanced_tab_widget.save_config(config)
+        # Updates the in-memory config; it reaches disk on the save timer or
+        # when the dialog closes (flush_config).
+        values = {}
+        self.advanced_tab_widget.save_config(values)
         
-        config["locked_deck_name"] = self.locked_deck_name
-        config[CONFIG_KEY_CONFIRM_CLIPBOARD_QUICK_IMPORT] = self.confirm_clipboard_quick_import
-        config[CONFIG_KEY_ALLOW_ANY_CLIPBOARD_QUICK_IMPORT] = self.allow_any_clipboard_quick_import
+        values["locked_deck_name"] = self.locked_deck_name
+        values[CONFIG_KEY_CONFIRM_CLIPBOARD_QUICK_IMPORT] = self.confirm_clipboard_quick_import
+        values[CONFIG_KEY_ALLOW_ANY_CLIPBOARD_QUICK_IMPORT] = self.allow_any_clipboard_quick_import
         
         # Save new importer settings
-        config["allow_html"] = self.allow_html_check.isChecked()
-        config["existing_notes_index"] = self.existing_notes_combo.currentIndex()
-        config["match_scope_index"] = self.match_scope_combo.currentIndex()
-        config["tag_all"] = self.tag_all_edit.text()
-        config["tag_updated"] = self.tag_updated_edit.text()
-
-        if self.remember_history_check.isChecked():
-            config["saved_history"] = getattr(mw, "csv_import_plus_history", [])
-        else:
-            config.pop("saved_history", None)
-
-        mw.addonManager.writeConfig(self._get_config_name(), config)
+        values["allow_html"] = self.allow_html_check.isChecked()
+        values["existing_notes_index"] = self.existing_notes_combo.currentIndex()
+        values["match_scope_index"] = self.match_scope_combo.currentIndex()
+        values["tag_all"] = self.tag_all_edit.text()
+        values["tag_updated"] = self.tag_updated_edit.text()
+
+        # History now lives in user_files/history.jsonl.
+        self._config_store.get().pop("saved_history", None)
+        self._config_store.update(values)
+        self._config_save_timer.start(CONFIG_SAVE_DELAY_MS)
+
+    def flush_config(self):
+        self._config_save_timer.stop()
+        self._config_store.flush()
+
+    def get_import_batch_size(self) -> int:
+        config = self._config_store.get()
+        try:
+            return max(1, int(config.get("import_batch_size", importer.DEFAULT_BATCH_SIZE)))
+        except (TypeError, ValueError):
+            return importer.DEFAULT_BATCH_SIZE
 
-    def save_history_if_needed(self):
-        if hasattr(self, "remember_history_check") and self.remember_history_check.isChecked():
-            self.save_config()
+    def get_duplicate_lookup(self) -> str:
+        return "sql" if self.sql_duplicate_lookup_check.isChecked() else "index"
 
     def on_deck_lock_toggled(self, checked):
         if checked:
@@ -239,6 +276,7 @@ class CSVImportPlusDialog(QDialog):
         self.on_content_changed()
 
     def on_remember_history_toggled(self, checked):
+        history_store.get_store().set_persistent(checked)
         self.save_config()
 
     # -------------------- Deck/model helpers --------------------
@@ -329,146 +367,100 @@ class CSVImportPlusDialog(QDialog):
             self.on_content_changed()
 
     def populate_bulk_table(self):
-        self.import_tab_widget.bulk_table.setRowCount(0)
-        self.import_tab_widget.bulk_table.setRowCount(len(self.file_paths))
-        
         self.bulk_file_details = []
+        self._bulk_generation += 1
+        generation = self._bulk_generation
         
-        for row_idx, path in enumerate(self.file_paths):
-            filename = os.path.basename(path)
-            
-            # Read file content
-            content = ""
-            for enc in ("utf-8", "utf-8-sig"):
-                try:
-                    with open(path, "r", encoding=enc, newline="") as f:
-                        content = f.read()
-                        break
-                except Exception:
-                    continue
-            if not content:
-                try:
-                    with open(path, "r", errors="ignore") as f:
-                        content = f.read()
-                except Exception:
-                    pass
-            
-            # Detect formatting
-            delimiter = ","
-            rows_count = 0
-            if content:
-                try:
-                    delimiter, rows_count = detector.detect_csv_format(content)
-                except Exception:
-                    pass
-            
-            # Auto-pick model/note type
-            model_idx = None
-            
-            # Check for directive
-            directives = detector.extract_directives(content)
-            directive_nt_name = directives.get("notetype")
-            if directive_nt_name:
-                idx = detector.find_model_index_by_name(self.model_infos, directive_nt_name)
-                if idx is not None:
-                    model_idx = idx
-            
-            if model_idx is None and content:
-                best_name, best_fields, best_idx = detector.auto_pick_note_type(
-                    content, delimiter, self.model_infos, self.header_check
-                )
-                if best_idx is not None:
-                    model_idx = best_idx
-            
+        # Show every file right away; analysis results fill the rows in.
+        for path in self.file_paths:
             self.bulk_file_details.append({
                 "path": path,
-                "content": content,
-                "delimiter": delimiter,
-                "model_idx": model_idx,
-                "rows_count": rows_count,
-                "selected_delim_idx": 0
+                "sample": "",
+                "source": None,
+                "delimiter": ",",
+                "model_idx": None,
+                "rows_count": 0,
+                "selected_delim_idx": 0,
+                "analyzing": True,
             })
-            
-            self.setup_bulk_table_row(row_idx, filename, path, content, delimiter, model_idx, rows_count)
-
-    def refresh_bulk_table_from_details(self):
-        self.import_tab_widget.bulk_table.setRowCount(0)
-        self.import_tab_widget.bulk_table.setRowCount(len(self.bulk_file_details))
+        self.refresh_bulk_table_from_details()
         
-        for row_idx, details in enumerate(self.bulk_file_details):
-            path = details["path"]
-            filename = os.path.basename(path)
-            content = details["content"]
-            delimiter = details["delimiter"]
-            model_idx = details["model_idx"]
-            rows_count = details["rows_count"]
-            
-            self.setup_bulk_table_row(row_idx, filename, path, content, delimiter, model_idx, rows_count)
+        pending = list(self.bulk_file_details)
+        bulk.analyze_files(
+            [d["path"] for d in pending],
+            lambda idx, future: self._on_bulk_file_analyzed(generation, pending[idx], future),
+        )
 
-    def setup_bulk_table_row(self, row_idx, filename, path, content, delimiter, model_idx, rows_count):
-        table = self.import_tab_widget.bulk_table
-        
-        # 1. File Name
-        item_name = QTableWidgetItem(filename)
-        item_name.setToolTip(path)
-        item_name.setFlags(item_name.flags() & ~Qt.ItemFlag.ItemIsEditable)
-        table.setItem(row_idx, 0, item_name)
-        
-        # 2. Delimiter Combo
-        delim_combo = QComboBox()
-        delim_combo.addItems([
-            "Auto-detect",
-            "Comma (,)",
-            "Tab",
-            "Semicolon (;)",
-            "Pipe (|)"
-        ])
-        selected_delim_idx = self.bulk_file_details[row_idx].get("selected_delim_idx", 0)
-        delim_combo.setCurrentIndex(selected_delim_idx)
-        delim_combo.currentIndexChanged.connect(lambda idx, r=row_idx: self.on_row_delimiter_changed(r, idx))
-        table.setCellWidget(row_idx, 1, delim_combo)
-        
-        # 3. Note Type Combo
-        model_combo = QComboBox()
-        model_combo.addItem("None", None)
-        for m in self.model_infos:
-            model_combo.addItem(m.name, m.id)
-            
-        if model_idx is not None:
-            # Add 1 because index 0 is "None"
-            model_combo.setCurrentIndex(model_idx + 1)
-        else:
-            model_combo.setCurrentIndex(0)
-            
-        model_combo.currentIndexChanged.connect(lambda idx, r=row_idx: self.on_row_model_changed(r, idx))
-        table.setCellWidget(row_idx, 2, model_combo)
-        
-        # 4. Rows Count
-        item_rows = QTableWidgetItem(str(rows_count))
-        item_rows.setFlags(item_rows.flags() & ~Qt.ItemFlag.ItemIsEditable)
-        table.setItem(row_idx, 3, item_rows)
+    def _on_bulk_file_analyzed(self, generation, details, future):
+        # Drop results for a table that was rebuilt or a row that was removed.
+        if generation != self._bulk_generation:
+            return
+        if not any(d is details for d in self.bulk_file_details):
+            return
+        details["analyzing"] = False
         
-        # 5. Status
-        item_status = QTableWidgetItem("Ready")
-        item_status.setFlags(item_status.flags() & ~Qt.ItemFlag.ItemIsEditable)
-        table.setItem(row_idx, 4, item_status)
+        sample = ""
+        source = None
+        try:
+            sample, source = future.result()
+        except Exception:
+            pass
+        details["sample"] = sample
+        details["source"] = source
+        if source is not None:
+            details["delimiter"] = source.delimiter
+            details["rows_count"] = source.row_count
+        details["model_idx"] = self._pick_bulk_note_type(details)
         
-        # 6. Actions Widget (Remove button)
-        actions_widget = QWidget()
-        actions_layout = QHBoxLayout(actions_widget)
-        actions_layout.setContentsMargins(2, 2, 2, 2)
-        actions_layout.setSpacing(4)
+        row_idx = self.import_tab_widget.bulk_model.row_of(details)
+        self._set_bulk_status(details, "Ready")
         
-        remove_btn = QPushButton("✖")
-        remove_btn.setToolTip("Remove file")
-        remove_btn.setFixedSize(24, 24)
-        remove_btn.setStyleSheet("color: red; font-weight: bold;")
-        remove_btn.clicked.connect(lambda _, r=row_idx: self.remove_bulk_file(r))
+        # Column previews come from the first file.
+        if row_idx == 0:
+            self.update_field_mapping_ui()
+
+    def _pick_bulk_note_type(self, details):
+        # Auto-pick model/note type from the file's kept analysis.
+        model_idx = None
         
-        actions_layout.addWidget(remove_btn)
-        actions_layout.addStretch()
+        # Check for directive
+        directives = detector.extract_directives(details["sample"])
+        directive_nt_name = directives.get("notetype")
+        if directive_nt_name:
+            idx = detector.find_model_index_by_name(self.model_infos, directive_nt_name)
+            if idx is not None:
+                model_idx = idx
         
-        table.setCellWidget(row_idx, 5, actions_widget)
+        if model_idx is None and details["source"] is not None:
+            best_name, best_fields, best_idx = detector.pick_note_type(
+                details["source"], self.model_infos, self.header_check
+            )
+            if best_idx is not None:
+                model_idx = best_idx
+        return model_idx
+
+    def _bulk_detection_settings(self):
+        # Settings the per-file note type pick depends on.
+        return (self.header_check.isChecked(),)
+
+    def repick_bulk_note_types(self):
+        # Re-run the note type pick of analyzed files in place; the files
+        # themselves are not read again.
+        bulk_model = self.import_tab_widget.bulk_model
+        for row_idx, details in enumerate(self.bulk_file_details):
+            if details.get("analyzing"):
+                continue
+            model_idx = self._pick_bulk_note_type(details)
+            if model_idx != details["model_idx"]:
+                details["model_idx"] = model_idx
+                bulk_model.refresh_row(row_idx)
+
+    def refresh_bulk_table_from_details(self):
+        # Only a full reload resets the model; moves and removals update
+        # single rows through move_bulk_file_to()/remove_bulk_file().
+        self.import_tab_widget.bulk_model.set_files(
+            self.bulk_file_details, [m.name for m in self.model_infos]
+        )
 
     def on_row_delimiter_changed(self, row_idx, combo_idx):
         if 0 <= row_idx < len(self.bulk_file_details):
@@ -476,33 +468,35 @@ class CSVImportPlusDialog(QDialog):
             details["selected_delim_idx"] = combo_idx
             
             # Recalculate delimiter and rows_count
-            content = details["content"]
-            delimiter = ","
-            if combo_idx == 0: # Auto-detect
-                try:
-                    delimiter, _ = detector.detect_csv_format(content)
-                except Exception:
-                    pass
-            else:
+            delimiter = None
+            if combo_idx != 0: # Not auto-detect
                 delim_map = {1: ",", 2: "\t", 3: ";", 4: "|"}
                 delimiter = delim_map.get(combo_idx, ",")
-                
-            details["delimiter"] = delimiter
             
-            # Re-read row count using selected delimiter
-            rows_count = 0
-            if content:
+            # Re-analyze using selected delimiter
+            details["source"] = None
+            details["analyzing"] = True
+            details["analysis_token"] = token = object()
+            bulk_model = self.import_tab_widget.bulk_model
+            bulk_model.refresh_row(row_idx)
+            
+            def on_done(future):
+                if details.get("analysis_token") is not token:
+                    return
+                details["analyzing"] = False
+                rows_count = 0
                 try:
-                    reader = csv.reader(io.StringIO(content), delimiter=delimiter)
-                    rows_count = sum(1 for _ in reader)
+                    _sample, details["source"] = future.result()
+                    details["delimiter"] = details["source"].delimiter
+                    rows_count = details["source"].row_count
                 except Exception:
-                    pass
-            details["rows_count"] = rows_count
+                    details["delimiter"] = delimiter or ","
+                details["rows_count"] = rows_count
+                bulk_model.refresh_row(bulk_model.row_of(details))
             
-            # Update rows count item in table
-            item_rows = self.import_tab_widget.bulk_table.item(row_idx, 3)
-            if item_rows:
-                item_rows.setText(str(rows_count))
+            importer.run_in_background(
+                lambda: bulk.analyze_file(details["path"], delimiter), on_done
+            )
 
     def on_row_model_changed(self, row_idx, combo_idx):
         if 0 <= row_idx < len(self.bulk_file_details):
@@ -519,19 +513,16 @@ class CSVImportPlusDialog(QDialog):
             path = self.file_paths.pop(src_row)
             self.file_paths.insert(dest_row, path)
             
-            details = self.bulk_file_details.pop(src_row)
-            self.bulk_file_details.insert(dest_row, details)
-            
-            self.refresh_bulk_table_from_details()
+            # Moves the details entry along with its row.
+            self.import_tab_widget.bulk_model.move_row(src_row, dest_row)
+            self.import_tab_widget.bulk_table.selectRow(dest_row)
 
     def remove_bulk_file(self, row_idx):
         if 0 <= row_idx < len(self.file_paths):
             self.file_paths.pop(row_idx)
-            self.bulk_file_details.pop(row_idx)
+            self.import_tab_widget.bulk_model.remove_row(row_idx)
             if not self.file_paths:
                 self.load_text_content("")
-            else:
-                self.refresh_bulk_table_from_details()
 
     def load_text_content(self, text: str):
         # Clear selected file
@@ -570,19 +561,7 @@ class CSVImportPlusDialog(QDialog):
     def read_file_text(self) -> str:
         if not self.file_path:
             return ""
-        # Try utf-8 and utf-8-sig
-        for enc in ("utf-8", "utf-8-sig"):
-            try:
-                with open(self.file_path, "r", encoding=enc, newline="") as f:
-                    return f.read()
-            except Exception:
-                continue
-        # Fallback
-        try:
-            with open(self.file_path, "r", errors="ignore") as f:
-                return f.read()
-        except Exception:
-            return ""
+        return file_source.read_text(self.file_path)
 
     def get_active_raw(self) -> str:
         # Prefer Paste if it has content; otherwise use selected file (if any)
@@ -612,26 +591,41 @@ class CSVImportPlusDialog(QDialog):
         self.csv_text.setFocus()
         self.on_content_changed()
 
-    def raw_content_is_valid_csv(self, raw: str) -> bool:
-        csv_content = detector.strip_directive_lines(raw).strip()
-        if not csv_content:
-            return False
-
-        try:
-            delimiter = importer.get_delimiter(self.delimiter_combo, csv_content)
-            reader = csv.reader(io.StringIO(csv_content), delimiter=delimiter)
-            rows = [row for row in reader if any(cell.strip() for cell in row)]
-        except Exception:
-            return False
+    def _clipboard_delimiter(self):
+        # None means sniff it from the content.
+        combo = self.delimiter_combo
+        if combo.currentIndex() == 0 or combo.currentText().startswith("Auto-detect"):
+            return None
+        return importer.get_delimiter(self.delimiter_combo, "")
+
+    def _clipboard_verdict_key(self, raw: str):
+        prefix = raw[:detector.VALIDATION_PREFIX_CHARS]
+        return (
+            detector.content_digest(prefix),
+            len(raw) > len(prefix),
+            self._clipboard_delimiter(),
+        )
 
-        if not rows:
-            return False
+    def _store_clipboard_verdict(self, key, verdict: bool):
+        self._clipboard_verdicts[key] = verdict
+        self._clipboard_verdicts.move_to_end(key)
+        while len(self._clipboard_verdicts) > CLIPBOARD_VERDICT_CACHE_SIZE:
+            self._clipboard_verdicts.popitem(last=False)
 
+    def raw_content_is_valid_csv(self, raw: str) -> bool:
         # Treat clipboard quick import as CSV-only unless the Advanced override is enabled.
-        return any(len(row) > 1 for row in rows)
+        key = self._clipboard_verdict_key(raw)
+        verdict = self._clipboard_verdicts.get(key)
+        if verdict is None:
+            try:
+                verdict = detector.looks_like_csv(raw, key[2])
+            except Exception:
+                verdict = False
+            self._store_clipboard_verdict(key, verdict)
+        return verdict
 
     def raw_content_allows_quick_clipboard_import(self, raw: str) -> bool:
-        if not raw.strip():
+        if not raw or raw.isspace():
             return False
         if self.allow_any_clipboard_quick_import:
             return True
@@ -644,7 +638,40 @@ class CSVImportPlusDialog(QDialog):
         return self.raw_content_allows_quick_clipboard_import(clipboard.text())
 
     def update_quick_clipboard_button_state(self):
-        can_import = self.clipboard_can_quick_import()
+        # Runs on every clipboard change anywhere on the system, so the CSV
+        # check only looks at a bounded prefix, is cached per content and runs
+        # off the GUI thread.
+        self._clipboard_check_generation += 1
+        clipboard = QApplication.clipboard()
+        raw = clipboard.text() if clipboard is not None else ""
+        if not raw or raw.isspace() or self.allow_any_clipboard_quick_import:
+            self._set_quick_clipboard_state(self.raw_content_allows_quick_clipboard_import(raw))
+            return
+
+        key = self._clipboard_verdict_key(raw)
+        verdict = self._clipboard_verdicts.get(key)
+        if verdict is not None:
+            self._set_quick_clipboard_state(verdict)
+            return
+
+        self.quick_clipboard_btn.setEnabled(False)
+        self.quick_clipboard_btn.setToolTip("Checking clipboard content…")
+        generation = self._clipboard_check_generation
+        # One extra character tells looks_like_csv the text was cut.
+        prefix = raw[:detector.VALIDATION_PREFIX_CHARS + 1]
+
+        def on_done(future):
+            try:
+                verdict = future.result()
+            except Exception:
+                verdict = False
+            self._store_clipboard_verdict(key, verdict)
+            if generation == self._clipboard_check_generation:
+                self._set_quick_clipboard_state(verdict)
+
+        importer.run_in_background(lambda: detector.looks_like_csv(prefix, key[2]), on_done)
+
+    def _set_quick_clipboard_state(self, can_import: bool):
         self.quick_clipboard_btn.setEnabled(can_import)
         if can_import:
             if self.allow_any_clipboard_quick_import:
@@ -688,7 +715,7 @@ class CSVImportPlusDialog(QDialog):
         detected_delim = ","
         if not disable_delim_detect:
             try:
-                detected_delim, _ = detector.detect_csv_format(raw_stripped)
+                detected_delim = detector.sniff_delimiter(raw_stripped)
                 delim_map = {",": 1, "\t": 2, ";": 3, "|": 4}
                 delim_idx = delim_map.get(detected_delim)
                 if delim_idx is not None:
@@ -698,6 +725,14 @@ class CSVImportPlusDialog(QDialog):
             except Exception:
                 pass
 
+        delimiter = detected_delim
+        if disable_delim_detect:
+            delimiter = importer.get_delimiter(self.delimiter_combo, raw_stripped)
+        try:
+            source = detector.analyze(raw_stripped, delimiter)
+        except Exception:
+            source = None
+
         if not disable_nt_detect:
             directives = detector.extract_directives(raw)
             nt_name = directives.get("notetype")
@@ -705,11 +740,8 @@ class CSVImportPlusDialog(QDialog):
             if nt_name:
                 best_idx = detector.find_model_index_by_name(self.model_infos, nt_name)
             else:
-                delimiter = detected_delim
-                if disable_delim_detect:
-                    delimiter = importer.get_delimiter(self.delimiter_combo, raw_stripped)
-                (_, _, best_idx) = detector.auto_pick_note_type(
-                    raw_stripped, delimiter, self.model_infos, self.header_check
+                (_, _, best_idx) = detector.pick_note_type(
+                    source, self.model_infos, self.header_check
                 )
             
             if best_idx is not None:
@@ -718,22 +750,24 @@ class CSVImportPlusDialog(QDialog):
                 self.notetype_combo.blockSignals(False)
 
         if self.confirm_clipboard_quick_import:
-            summary = self._build_clipboard_import_summary(raw)
+            summary = self._build_clipboard_import_summary(raw, source)
             if not self._confirm_clipboard_quick_import(summary, raw):
                 return
 
         self._run_import(raw, clear_pasted_input=False, use_mapping=False)
         self.update_quick_clipboard_button_state()
 
-    def _build_clipboard_import_summary(self, raw: str) -> str:
+    def _build_clipboard_import_summary(self, raw: str, source=None) -> str:
         csv_content = detector.strip_directive_lines(raw)
         delimiter = importer.get_delimiter(self.delimiter_combo, csv_content)
         delimiter_name = detector.get_delimiter_name(delimiter)
 
         try:
-            reader = csv.reader(io.StringIO(csv_content), delimiter=delimiter)
-            row_count = sum(1 for _ in reader)
+            if source is None or source.delimiter != delimiter:
+                source = detector.analyze(csv_content, delimiter)
+            row_count = source.row_count
         except Exception:
+            source = None
             row_count = 0
 
         rows_to_import = row_count
@@ -757,8 +791,8 @@ class CSVImportPlusDialog(QDialog):
                 f"Deck: {self.deck_combo.currentText()}",
                 f"Note type: {note_type_name}",
                 f"Delimiter: {delimiter_name}",
-                f"Rows detected: {row_count}",
-                f"Rows to import: {max(0, rows_to_import)}",
+                f"Rows detected: {detector.format_row_count(source)}",
+                f"Rows to import: {'' if source is None or source.row_count_exact else '~'}{max(0, rows_to_import)}",
             ]
         )
 
@@ -818,28 +852,65 @@ class CSVImportPlusDialog(QDialog):
         return confirmed
 
     def _run_import(self, raw: str, clear_pasted_input: bool, use_mapping: bool = True):
+        if self._import_running:
+            return
         self.save_config()
         field_mapping = {}
         if use_mapping and hasattr(self, "mapping_dropdowns"):
             for name, combo in self.mapping_dropdowns.items():
                 val = combo.itemData(combo.currentIndex())
                 field_mapping[name] = val
-        result = importer.do_import(
-            raw,
-            self.deck_combo,
-            self.deck_infos,
-            self.notetype_combo,
-            self.model_infos,
-            self.header_check,
-            self.delimiter_combo,
-            allow_html=self.allow_html_check.isChecked(),
-            existing_notes_index=self.existing_notes_combo.currentIndex(),
-            match_scope_index=self.match_scope_combo.currentIndex(),
-            tag_all=self.tag_all_edit.text(),
-            tag_updated=self.tag_updated_edit.text(),
-            field_mapping=field_mapping,
+        try:
+            job = importer.prepare_import(
+                raw,
+                self.deck_combo,
+                self.deck_infos,
+                self.notetype_combo,
+                self.model_infos,
+                self.header_check,
+                self.delimiter_combo,
+                allow_html=self.allow_html_check.isChecked(),
+                existing_notes_index=self.existing_notes_combo.currentIndex(),
+                match_scope_index=self.match_scope_combo.currentIndex(),
+                tag_all=self.tag_all_edit.text(),
+                tag_updated=self.tag_updated_edit.text(),
+                field_mapping=field_mapping,
+                batch_size=self.get_import_batch_size(),
+                duplicate_lookup=self.get_duplicate_lookup(),
+                batch_tag=self.batch_tag_check.isChecked(),
+            )
+        except importer.ImportFailed as e:
+            showWarning(str(e))
+            return
+
+        self._set_import_running(True)
+        self.progress_bar.setRange(0, 0)
+
+        def task():
+            return importer.run_import_job(
+                job,
+                progress=self._report_import_progress,
+                is_cancelled=self._import_cancel.is_set,
+            )
+
+        importer.run_in_background(
+            task, lambda fut: self._on_import_done(job, fut, clear_pasted_input)
         )
+
+    def _on_import_done(self, job, future, clear_pasted_input: bool):
+        self._set_import_running(False)
+        result = None
+        try:
+            result = importer.finish_import(job, future.result())
+        except importer.ImportCancelled:
+            self.status_label.setText("⚠ Import cancelled. Changes were rolled back.")
+        except importer.ImportFailed as e:
+            showWarning(str(e))
+        except Exception as e:
+            showWarning(f"Import failed: {str(e)}")
+
         if result:
+            mw.reset()
             self.history_tab_widget.refresh_history()
             if clear_pasted_input:
                 # Clear only pasted input after successful import from editor/file.
@@ -858,12 +929,96 @@ class CSVImportPlusDialog(QDialog):
 
         if self.deck_lock_check.isChecked() and self.locked_deck_name:
             self.deck_combo.setCurrentText(self.locked_deck_name)
+        self._close_if_pending()
+
+    def _set_import_running(self, running: bool):
+        self._import_running = running
+        if running:
+            self._import_cancel.clear()
+        tab = self.import_tab_widget
+        tab.quick_btn.setEnabled(not running)
+        tab.anki_btn.setEnabled(not running)
+        tab.remove_btn.setEnabled(not running)
+        tab.cancel_btn.setEnabled(not running)
+        tab.browse_btn.setEnabled(not running)
+        # No reordering, removing or editing files mid-import.
+        tab.bulk_table.setEnabled(not running)
+        tab.paste_clipboard_btn.setEnabled(not running and not self.file_paths)
+        if running:
+            self.quick_clipboard_btn.setEnabled(False)
+        else:
+            self.update_quick_clipboard_button_state()
+        self.progress_bar.setVisible(running)
+        self.cancel_import_btn.setVisible(running)
+        self.cancel_import_btn.setEnabled(running)
+        self._set_import_progress_dialog(running)
+
+    def _set_import_progress_dialog(self, running: bool):
+        # Application-modal while the import writes in the background: an
+        # undoable action taken in the main window meanwhile would otherwise
+        # land in the import's undo step and be reverted by Cancel.
+        dialog = self._import_progress_dialog
+        if dialog is not None:
+            # close() would emit canceled.
+            dialog.blockSignals(True)
+            dialog.close()
+            dialog.deleteLater()
+            self._import_progress_dialog = None
+        if not running:
+            return
+        dialog = QProgressDialog("Importing…", "Cancel Import", 0, 0, self)
+        dialog.setWindowTitle("CSV Import Plus")
+        dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(self.cancel_import)
+        dialog.show()
+        self._import_progress_dialog = dialog
+
+    def _update_import_progress_dialog(self, text, value=None, maximum=None):
+        dialog = self._import_progress_dialog
+        if dialog is None:
+            return
+        dialog.setLabelText(text)
+        if maximum is not None:
+            dialog.setRange(0, maximum)
+        if value is not None:
+            dialog.setValue(value)
+
+    def cancel_import(self):
+        if self._import_running:
+            self._import_cancel.set()
+            self.cancel_import_btn.setEnabled(False)
+            self._update_import_progress_dialog("Cancelling…")
+            self.status_label.setText("Cancelling import…")
+
+    def _report_import_progress(self, rows_done: int):
+        # Called from the import thread.
+        importer.run_on_main(lambda: self._on_import_progress(rows_done))
+
+    def _on_import_progress(self, rows_done: int):
+        if self._import_running and not self._import_cancel.is_set():
+            self.status_label.setText(f"Importing… {rows_done} row(s) processed")
+            self._update_import_progress_dialog(f"Importing… {rows_done} row(s) processed")
+
+    def _close_if_pending(self):
+        if self._close_after_import:
+            self._close_after_import = False
+            self.close()
 
     # -------------------- Status updates --------------------
     def on_content_changed(self):
         self.update_quick_clipboard_button_state()
+        self._parsed_source = None
+        self._row_count_generation += 1
         if self.file_paths:
-            self.populate_bulk_table()
+            settings = self._bulk_detection_settings()
+            if [d["path"] for d in self.bulk_file_details] != self.file_paths:
+                self.populate_bulk_table()
+            elif settings != self._bulk_settings:
+                self.repick_bulk_note_types()
+            self._bulk_settings = settings
             self.update_field_mapping_ui()
             return
         raw = self.get_active_raw()
@@ -906,10 +1061,9 @@ class CSVImportPlusDialog(QDialog):
 
         # Live delimiter detection preview (updates even in manual mode).
         detected_delimiter = None
-        detected_rows = 0
         if not disable_delim_detect:
             try:
-                detected_delimiter, detected_rows = detector.detect_csv_format(content)
+                detected_delimiter = detector.sniff_delimiter(content)
                 detected_name = detector.get_delimiter_name(detected_delimiter)
                 self.delimiter_combo.setItemText(0, f"Auto-detect ({detected_name})")
             except Exception as e:
@@ -926,25 +1080,25 @@ class CSVImportPlusDialog(QDialog):
             except Exception:
                 pass
 
-        # Determine delimiter & rows used for preview/status and import settings.
+        # Determine delimiter used for preview/status and import settings.
         if self.delimiter_combo.currentIndex() == 0:
             delimiter = detected_delimiter if detected_delimiter is not None else ","
-            rows = detected_rows
         else:
             delimiter = importer.get_delimiter(self.delimiter_combo, content)
-            try:
-                reader = csv.reader(io.StringIO(content), delimiter=delimiter)
-                rows = sum(1 for _ in reader)
-            except Exception:
-                rows = 0
+
+        # Parse once; row count, note type pick and column previews share it.
+        try:
+            self._parsed_source = detector.analyze(content, delimiter)
+        except Exception:
+            self._parsed_source = None
 
         delim_name = detector.get_delimiter_name(delimiter)
 
         # Auto-pick note type if not forced
         detected_model = None
         if not forced_model_info and not disable_nt_detect:
-            (best_name, best_fields, best_idx) = detector.auto_pick_note_type(
-                content, delimiter, self.model_infos, self.header_check
+            (best_name, best_fields, best_idx) = detector.pick_note_type(
+                self._parsed_source, self.model_infos, self.header_check
             )
             if best_idx is not None:
                 self.notetype_combo.setCurrentIndex(best_idx)
@@ -952,7 +1106,7 @@ class CSVImportPlusDialog(QDialog):
 
         parts = []
         parts.append(f"✓ Detected: {delim_name} delimiter")
-        parts.append(f"{rows} row(s)")
+        parts.append(f"{detector.format_row_count(self._parsed_source)} row(s)")
         if forced_model_info:
             model_name, field_count = forced_model_info
             parts.append(
@@ -965,6 +1119,32 @@ class CSVImportPlusDialog(QDialog):
         self.status_label.setText(" • ".join(parts))
         self.update_field_mapping_ui()
 
+        if self._parsed_source is not None and not self._parsed_source.row_count_exact:
+            self._count_rows_in_background(content, self._parsed_source, parts, 1)
+
+    def _count_rows_in_background(self, content, source, parts, rows_part):
+        # Large inputs only get an estimated row count while typing; the exact
+        # figure replaces it when ready unless the content changed meanwhile.
+        # A count whose content changed stops early instead of running on.
+        generation = self._row_count_generation
+
+        def is_stale():
+            return generation != self._row_count_generation
+
+        def on_done(future):
+            if is_stale():
+                return
+            try:
+                source.set_exact_row_count(future.result())
+            except Exception:
+                return
+            parts[rows_part] = f"{source.row_count} row(s)"
+            self.status_label.setText(" • ".join(parts))
+
+        importer.run_in_background(
+            lambda: detector.count_rows(content, source.delimiter, is_stale), on_done
+        )
+
     def open_with_default_importer(self):
         raw = self.get_active_raw()
         importer.open_with_default_importer(raw, self.deck_combo, self.deck_infos)
@@ -979,26 +1159,20 @@ class CSVImportPlusDialog(QDialog):
             self._run_import(raw, clear_pasted_input=True)
 
     def remove_selected_files(self):
-        selected_ranges = self.import_tab_widget.bulk_table.selectedRanges()
-        if not selected_ranges:
+        selected_rows = self.import_tab_widget.bulk_table.selectionModel().selectedRows()
+        if not selected_rows:
             return
         
-        indices_to_remove = set()
-        for r in selected_ranges:
-            for i in range(r.topRow(), r.bottomRow() + 1):
-                indices_to_remove.add(i)
+        indices_to_remove = {index.row() for index in selected_rows}
                 
         for i in sorted(indices_to_remove, reverse=True):
             if 0 <= i < len(self.file_paths):
                 self.file_paths.pop(i)
-                if i < len(self.bulk_file_details):
-                    self.bulk_file_details.pop(i)
+                self.import_tab_widget.bulk_model.remove_row(i)
                 
         if not self.file_paths:
             # Revert to single file/editor mode
             self.load_text_content("")
-        else:
-            self.refresh_bulk_table_from_details()
 
     def add_file_paths(self, paths):
         for p in paths:
@@ -1007,7 +1181,10 @@ class CSVImportPlusDialog(QDialog):
         self.load_files(self.file_paths)
 
     def run_bulk_import(self):
-        if not self.file_paths:
+        if not self.file_paths or self._import_running:
+            return
+        if any(d.get("analyzing") for d in self.bulk_file_details):
+            showWarning("Some files are still being analyzed. Try again in a moment.")
             return
 
         deck_idx = self.deck_combo.currentIndex()
@@ -1022,6 +1199,9 @@ class CSVImportPlusDialog(QDialog):
         tag_updated = self.tag_updated_edit.text()
         
         self.save_config()
+        batch_size = self.get_import_batch_size()
+        duplicate_lookup = self.get_duplicate_lookup()
+        batch_tag = self.batch_tag_check.isChecked()
 
         # Collect mapping
         field_mapping = {}
@@ -1030,33 +1210,16 @@ class CSVImportPlusDialog(QDialog):
                 val = combo.itemData(combo.currentIndex())
                 field_mapping[name] = val
 
-        # Disable main UI buttons during import
-        self.import_tab_widget.quick_btn.setEnabled(False)
-        self.import_tab_widget.remove_btn.setEnabled(False)
-        self.import_tab_widget.cancel_btn.setEnabled(False)
-        self.import_tab_widget.browse_btn.setEnabled(False)
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, len(self.file_paths))
-        self.progress_bar.setValue(0)
-
-        total_added = 0
-        total_updated = 0
-        total_skipped = 0
-        success_count = 0
-        
-        for idx, details in enumerate(self.bulk_file_details):
-            path = details["path"]
-            content = details["content"]
-            delimiter = details["delimiter"]
+        # Resolve every file's job on the main thread; only the collection work
+        # runs in the background.
+        jobs = []
+        for details in self.bulk_file_details:
             model_idx = details["model_idx"]
             
             if model_idx is None:
-                self.import_tab_widget.bulk_table.setItem(idx, 4, QTableWidgetItem("Failed: No note type selected/picked"))
+                self._set_bulk_status(details, "Failed: No note type selected/picked")
                 continue
                 
-            self.import_tab_widget.bulk_table.setItem(idx, 4, QTableWidgetItem("Importing..."))
-            QApplication.processEvents()
-            
             dummy_deck_combo = DummyWidget(_index=deck_idx, _text=self.deck_combo.currentText())
             dummy_notetype_combo = DummyWidget(_index=model_idx)
             dummy_delimiter_combo = DummyWidget(_index=details.get("selected_delim_idx", 0), _text="Auto-detect")
@@ -1074,7 +1237,7 @@ class CSVImportPlusDialog(QDialog):
             else:
                 # Load saved mapping for this note type
                 model_info = self.model_infos[model_idx]
-                config = mw.addonManager.getConfig(self._get_config_name()) or {}
+                config = self._config_store.get()
                 saved_mappings = config.get("field_mappings", {}).get(model_info.name, {})
                 for name, val in saved_mappings.items():
                     if val == "Nothing" or val is None:
@@ -1083,8 +1246,9 @@ class CSVImportPlusDialog(QDialog):
                         file_field_mapping[name] = val
 
             try:
-                res = importer.do_import(
-                    content,
+                # Stream the file body from disk instead of holding it.
+                job = importer.prepare_import(
+                    file_source.open_source(details["path"]),
                     dummy_deck_combo,
                     self.deck_infos,
                     dummy_notetype_combo,
@@ -1097,37 +1261,101 @@ class CSVImportPlusDialog(QDialog):
                     tag_all=tag_all,
                     tag_updated=tag_updated,
                     field_mapping=file_field_mapping,
+                    batch_size=batch_size,
+                    duplicate_lookup=duplicate_lookup,
+                    batch_tag=batch_tag,
                 )
-                if res:
-                    total_added += res["added"]
-                    total_updated += res["updated"]
-                    total_skipped += res["skipped_empty"]
-                    success_count += 1
-                    status_text = f"✓ Added: {res['added']}, Updated: {res['updated']}"
-                    self.import_tab_widget.bulk_table.setItem(idx, 4, QTableWidgetItem(status_text))
+            except (importer.ImportFailed, OSError) as e:
+                self._set_bulk_status(details, f"⚠ Failed: {str(e)}")
+                continue
+            self._set_bulk_status(details, "Queued")
+            jobs.append((details, job))
+
+        self._set_import_running(True)
+        self.progress_bar.setRange(0, len(self.file_paths))
+        self.progress_bar.setValue(0)
+
+        def task():
+            # Files are parsed ahead on the pipeline thread; this one is the only writer.
+            pipeline = bulk.ImportPipeline([job for _, job in jobs])
+            try:
+                return write_jobs(pipeline)
+            finally:
+                pipeline.close()
+
+        def write_jobs(pipeline):
+            results = []
+            for done, (details, job) in enumerate(jobs):
+                if self._import_cancel.is_set():
+                    break
+                importer.run_on_main(lambda d=details: self._set_bulk_status(d, "Importing..."))
+                try:
+                    res = importer.run_import_job(
+                        job,
+                        is_cancelled=self._import_cancel.is_set,
+                        batches=pipeline.batches(done),
+                    )
+                except importer.ImportCancelled:
+                    importer.run_on_main(lambda d=details: self._set_bulk_status(d, "Cancelled"))
+                    break
+                except importer.ImportFailed as e:
+                    status_text = f"⚠ Failed: {str(e)}"
+                except Exception as e:
+                    status_text = f"⚠ Error: {str(e)}"
                 else:
-                    self.import_tab_widget.bulk_table.setItem(idx, 4, QTableWidgetItem("⚠ Failed"))
-            except Exception as e:
-                self.import_tab_widget.bulk_table.setItem(idx, 4, QTableWidgetItem(f"⚠ Error: {str(e)}"))
-            
-            self.progress_bar.setValue(idx + 1)
-            QApplication.processEvents()
+                    results.append((job, res))
+                    status_text = f"✓ Added: {res['added']}, Updated: {res['updated']}"
+                importer.run_on_main(
+                    lambda d=details, t=status_text, n=done + 1: self._on_bulk_file_done(d, t, n)
+                )
+            return results
+
+        importer.run_in_background(task, self._on_bulk_import_done)
+
+    def _set_bulk_status(self, details, text):
+        # Keyed by the file's details, not its row, which may have moved.
+        details["status"] = text
+        bulk_model = self.import_tab_widget.bulk_model
+        bulk_model.refresh_row(bulk_model.row_of(details))
+
+    def _on_bulk_file_done(self, details, status_text, files_done):
+        self._set_bulk_status(details, status_text)
+        self.progress_bar.setValue(files_done)
+        if not self._import_cancel.is_set():
+            self._update_import_progress_dialog(
+                f"Imported {files_done}/{len(self.file_paths)} file(s)…",
+                files_done,
+                len(self.file_paths),
+            )
 
-        summary = f"Imported {success_count}/{len(self.file_paths)} files. Added {total_added} notes, updated {total_updated}."
+    def _on_bulk_import_done(self, future):
+        self._set_import_running(False)
+        try:
+            results = future.result()
+        except Exception as e:
+            showWarning(f"Import failed: {str(e)}")
+            results = []
+
+        total_added = 0
+        total_updated = 0
+        for job, res in results:
+            result = importer.finish_import(job, res)
+            total_added += result["added"]
+            total_updated += result["updated"]
+        if results:
+            mw.reset()
+
+        summary = f"Imported {len(results)}/{len(self.file_paths)} files. Added {total_added} notes, updated {total_updated}."
+        if self._import_cancel.is_set():
+            summary += " Cancelled; the interrupted file was rolled back."
         self.status_label.setText(summary)
         
-        # Re-enable main UI buttons
-        self.import_tab_widget.quick_btn.setEnabled(True)
-        self.import_tab_widget.remove_btn.setEnabled(True)
-        self.import_tab_widget.cancel_btn.setEnabled(True)
-        self.import_tab_widget.browse_btn.setEnabled(True)
-        self.progress_bar.setVisible(False)
-        
         # Refresh history tab if it exists
         try:
             self.history_tab_widget.refresh_history()
         except Exception:
             pass
+        self._close_if_pending()
 
     def update_field_mapping_ui(self):
         # 1. Clear current field mapping layout
@@ -1154,9 +1382,15 @@ class CSVImportPlusDialog(QDialog):
         
         # 3. Get previews for columns in current raw content/file
         col_previews = self.get_column_previews()
+        source = self.get_parsed_source()
+        suggested = detector.suggest_mapping(
+            source,
+            field_names + ["Tags"],
+            self.header_check.isChecked() or (source is not None and source.has_header_guess),
+        )
         
         # Re-get saved mapping for this note type
-        config = mw.addonManager.getConfig(self._get_config_name()) or {}
+        config = self._config_store.get()
         saved_mappings = config.get("field_mappings", {}).get(model_info.name, {})
 
         self.mapping_dropdowns = {}
@@ -1189,8 +1423,10 @@ class CSVImportPlusDialog(QDialog):
                     if not found:
                         combo.setCurrentIndex(0)
             else:
-                # Sane defaults
-                if name == "Tags":
+                # Sane defaults: header names first, then position
+                if name in suggested and suggested[name] < len(col_previews):
+                    combo.setCurrentIndex(suggested[name] + 1)
+                elif name == "Tags":
                     combo.setCurrentIndex(0)
                 else:
                     if idx < len(col_previews):
@@ -1205,47 +1441,48 @@ class CSVImportPlusDialog(QDialog):
             label_text = name + ":"
             self.field_mapping_layout.addRow(label_text, combo)
 
+    def get_parsed_source(self):
+        # Analysis of the content currently shown, computed by on_content_changed.
+        if self.file_paths:
+            if self.bulk_file_details:
+                return self.bulk_file_details[0].get("source")
+            return None
+        if self._parsed_source is None:
+            raw = self.get_active_raw()
+            if not raw:
+                return None
+            content = detector.strip_directive_lines(raw)
+            try:
+                if self.delimiter_combo.currentIndex() == 0:
+                    delimiter = detector.sniff_delimiter(content)
+                else:
+                    delimiter = importer.get_delimiter(self.delimiter_combo, content)
+                self._parsed_source = detector.analyze(content, delimiter)
+            except Exception:
+                return None
+        return self._parsed_source
+
     def get_column_previews(self) -> list[str]:
-        raw = self.get_active_raw()
-        if not raw:
-            if self.file_paths:
-                raw = self.bulk_file_details[0]["content"] if self.bulk_file_details else ""
-        if not raw:
-            return []
-        
-        content = detector.strip_directive_lines(raw)
-        delimiter = ","
-        try:
-            if self.delimiter_combo.currentIndex() == 0:
-                delimiter, _ = detector.detect_csv_format(content)
-            else:
-                delimiter = importer.get_delimiter(self.delimiter_combo, content)
-        except Exception:
-            delimiter = ","
-            
-        try:
-            reader = csv.reader(io.StringIO(content), delimiter=delimiter)
-            rows = [r for r in reader if r]
-            if not rows:
-                return []
-            first_row = rows[0]
-            previews = []
-            for idx, val in enumerate(first_row):
-                val_trimmed = val.strip()
-                if len(val_trimmed) > 15:
-                    val_trimmed = val_trimmed[:12] + "..."
-                previews.append(f"{idx + 1}: {val_trimmed}")
-            return previews
-        except Exception:
+        source = self.get_parsed_source()
+        if source is None or not source.table.row_count:
             return []
 
+        first_row = source.table.row(0)
+        previews = []
+        for idx, val in enumerate(first_row):
+            val_trimmed = val.strip()
+            if len(val_trimmed) > 15:
+                val_trimmed = val_trimmed[:12] + "..."
+            previews.append(f"{idx + 1}: {val_trimmed}")
+        return previews
+
     def save_field_mapping(self, name, combo):
         model_idx = self.notetype_combo.currentIndex()
         if model_idx < 0 or model_idx >= len(self.model_infos):
             return
         model_name = self.model_infos[model_idx].name
         
-        config = mw.addonManager.getConfig(self._get_config_name()) or {}
+        config = self._config_store.get()
         if "field_mappings" not in config:
             config["field_mappings"] = {}
         if model_name not in config["field_mappings"]:
@@ -1253,7 +1490,8 @@ class CSVImportPlusDialog(QDialog):
             
         val = combo.itemData(combo.currentIndex())
         config["field_mappings"][model_name][name] = val
-        mw.addonManager.writeConfig(self._get_config_name(), config)
+        self._config_store.mark_dirty()
+        self._config_save_timer.start(CONFIG_SAVE_DELAY_MS)
 
 
 class DummyWidget:
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+try:
+    from anki.utils import field_checksum
+except Exception:  # pragma: no cover - older Anki or tests
+    try:
+        from anki.utils import fieldChecksum as field_checksum
+    except Exception:
+        field_checksum = None
+
+# First-field -> note id indexes used by the Update/Preserve duplicate modes.
+# Indexes are keyed by (collection path, note type id, deck id or None) and
+# stay valid as long as the collection modification time is the one recorded
+# when the index was built or last updated by our own imports.
+MAX_CACHED_INDEXES = 4
+
+_INDEXES = OrderedDict()
+
+
+class DuplicateIndex:
+    def __init__(self, model_id, deck_id=None):
+        self.model_id = model_id
+        self.deck_id = deck_id
+        self.keys = {}
+        self.col_mod = None
+        self._exclude = ()
+
+    def build(self, col, col_mod):
+        if self.deck_id is not None:
+            # Same note type and deck
+            db_rows = col.db.all(
+                "select distinct n.id, n.flds from notes n "
+                "join cards c on n.id = c.nid "
+                "where n.mid = ? and c.did = ?",
+                self.model_id, self.deck_id
+            )
+        else:
+            # Same note type
+            db_rows = col.db.all(
+                "select id, flds from notes where mid = ?", self.model_id
+            )
+
+        keys = {}
+        for nid, flds in db_rows:
+            keys[first_field_key(flds)] = nid
+        self.keys = keys
+        self.col_mod = col_mod
+
+    def prefetch(self, col, keys, exclude_nids=()):
+        # The whole scope is already in memory. Notes the running import has
+        # added are recorded into the index between batches; exclude_nids
+        # keeps them from matching its later rows.
+        self._exclude = exclude_nids
+
+    def lookup(self, key):
+        nid = self.keys.get(key)
+        return None if nid in self._exclude else nid
+
+    def record(self, key, nid):
+        self.keys[key] = nid
+
+
+class SqlDuplicateLookup:
+    # Matches one batch of incoming keys at a time with a query on their
+    # first-field checksums (the notes.csum index), so only candidate notes
+    # leave SQLite. Keys are bound as query parameters: a temp table written
+    # through col.db would mark the collection modified and clear its undo
+    # queue, so prefetch() only ever reads.
+    CHUNK = 500
+    # notes.csum is taken from the stored field, whitespace included, while
+    # keys are stripped; notes whose first field has surrounding whitespace
+    # are read once per lookup and matched in Python instead.
+    # WHITESPACE is what str.strip() removes.
+    WHITESPACE = (
+        "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680"
+        "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+        "\u2028\u2029\u202f\u205f\u3000"
+    )
+
+    def __init__(self, model_id, deck_id=None):
+        self.model_id = model_id
+        self.deck_id = deck_id
+        self.keys = {}
+        self._padded = None
+
+    def _query(self, col, condition, args):
+        sql = f"select n.id, n.flds from notes n where n.mid = ? and {condition}"
+        args = [self.model_id] + list(args)
+        if self.deck_id is not None:
+            sql += " and exists (select 1 from cards c where c.nid = n.id and c.did = ?)"
+            args.append(self.deck_id)
+        return col.db.all(sql, *args)
+
+    def _padded_keys(self, col):
+        if self._padded is None:
+            self._padded = {}
+            rows = self._query(
+                col, f"{_FIRST_FIELD_SQL} != trim({_FIRST_FIELD_SQL}, ?)", [self.WHITESPACE]
+            )
+            for nid, flds in rows:
+                self._padded[first_field_key(flds)] = nid
+        return self._padded
+
+    def prefetch(self, col, keys, exclude_nids=()):
+        self.keys = {}
+        wanted = sorted(set(keys))
+        if not wanted:
+            return
+
+        db_rows = []
+        for start in range(0, len(wanted), self.CHUNK):
+            chunk = wanted[start:start + self.CHUNK]
+            if field_checksum is not None:
+                checksums = sorted({field_checksum(k) for k in chunk})
+                condition = f"n.csum in ({', '.join('?' * len(checksums))})"
+                db_rows.extend(self._query(col, condition, checksums))
+            else:
+                condition = (
+                    f"trim({_FIRST_FIELD_SQL}, ?) in ({', '.join('?' * len(chunk))})"
+                )
+                db_rows.extend(self._query(col, condition, [self.WHITESPACE] + chunk))
+
+        # Checksums can collide, so confirm the actual first field.
+        wanted = set(wanted)
+        for nid, flds in db_rows:
+            if nid in exclude_nids:
+                continue
+            key = first_field_key(flds)
+            if key in wanted:
+                self.keys[key] = nid
+
+        if field_checksum is not None:
+            for key, nid in self._padded_keys(col).items():
+                if key in wanted and key not in self.keys and nid not in exclude_nids:
+                    self.keys[key] = nid
+
+    def lookup(self, key):
+        return self.keys.get(key)
+
+
+# First field of n.flds in SQL.
+_FIRST_FIELD_SQL = "substr(n.flds, 1, instr(n.flds || char(31), char(31)) - 1)"
+
+
+def first_field_key(flds: str) -> str:
+    return flds.split("\x1f", 1)[0].strip()
+
+
+def collection_mod(col):
+    try:
+        return col.db.scalar("select mod from col")
+    except Exception:
+        return None
+
+
+def _cache_key(col, model_id, deck_id):
+    return (getattr(col, "path", None), model_id, deck_id)
+
+
+def get_index(col, model_id, deck_id=None):
+    mod = collection_mod(col)
+    key = _cache_key(col, model_id, deck_id)
+    index = _INDEXES.get(key)
+    if index is not None and mod is not None and index.col_mod == mod:
+        _INDEXES.move_to_end(key)
+        return index
+
+    index = DuplicateIndex(model_id, deck_id)
+    index.build(col, mod)
+    if mod is not None:
+        _INDEXES[key] = index
+        _INDEXES.move_to_end(key)
+        while len(_INDEXES) > MAX_CACHED_INDEXES:
+            _INDEXES.popitem(last=False)
+    return index
+
+
+def has_cached_index(col, model_id):
+    path = getattr(col, "path", None)
+    return any(key[0] == path and key[1] == model_id for key in _INDEXES)
+
+
+def record_added(col, model_id, deck_id, added, mod_before):
+    # Fold notes we just added into every cached index that was current before
+    # our writes, so the next import does not have to rescan the notes table.
+    # Anything that was already stale is dropped.
+    mod_after = collection_mod(col)
+    path = getattr(col, "path", None)
+    for key in list(_INDEXES):
+        index = _INDEXES[key]
+        if key[0] != path:
+            continue
+        if mod_before is None or mod_after is None or index.col_mod != mod_before:
+            del _INDEXES[key]
+            continue
+        if index.model_id == model_id:
+            if index.deck_id is not None and index.deck_id != deck_id:
+                # Cards may land in other decks via template deck overrides.
+                del _INDEXES[key]
+                continue
+            for first_field, nid in added:
+                index.record(first_field, nid)
+        index.col_mod = mod_after
+
+
+def clear_cache():
+    _INDEXES.clear()
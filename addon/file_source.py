@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import locale
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from . import detector
+
+# Decoded views of CSV files on disk. Files are memory-mapped and decoded
+# chunk by chunk, so a preview only touches the start of the file, and the
+# encoding is worked out once per file version. Sources are cached by
+# (path, mtime, size) and keep only that metadata and the first SAMPLE_SIZE
+# characters, so previews and detection of an unchanged file do not go back
+# to the disk. Full text is decoded again on each read and never cached, so
+# large files do not stay in memory for the session.
+CHUNK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+MAX_CACHED_SOURCES = 8
+
+_SOURCES = OrderedDict()
+_sources_lock = threading.Lock()
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_bom(head: bytes):
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+
+def fallback_encoding() -> str:
+    return locale.getpreferredencoding(False) or "utf-8"
+
+
+class FileSource:
+    def __init__(self, path, mtime, size):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        # None until the first read; then the encoding that decoded the file.
+        self.encoding = None
+        self.errors = "strict"
+        # Start of the decoded file; _complete when it is the whole file.
+        self._prefix = None
+        self._complete = False
+
+    def _chunks(self, chunk_size):
+        if self.size == 0:
+            return
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for start in range(0, len(view), chunk_size):
+                    yield view[start:start + chunk_size]
+
+    def _detect_encoding(self):
+        # A BOM wins; otherwise the file is UTF-8 if the first sample decodes
+        # as UTF-8, else the locale encoding as Python's open() would use.
+        head = next(self._chunks(SAMPLE_SIZE), b"")
+        encoding = detect_bom(head)
+        if encoding:
+            return encoding, "strict"
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(head)
+            # Stray bad bytes further down become U+FFFD rather than
+            # failing the whole file.
+            return "utf-8", "replace"
+        except UnicodeDecodeError:
+            return fallback_encoding(), "ignore"
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        if self.encoding is None:
+            self.encoding, self.errors = self._detect_encoding()
+        decoder = codecs.getincrementaldecoder(self.encoding)(self.errors)
+        for data in self._chunks(chunk_size):
+            text = decoder.decode(data)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def read_text(self) -> str:
+        if self._complete:
+            return self._prefix
+        text = "".join(self.iter_chunks())
+        self._keep_prefix(text, True)
+        return text
+
+    def read_prefix(self, max_chars: int) -> str:
+        if self._prefix is not None and (self._complete or max_chars <= len(self._prefix)):
+            return self._prefix[:max_chars]
+        parts = []
+        count = 0
+        complete = True
+        for text in self.iter_chunks(min(CHUNK_SIZE, max(max_chars, 4096))):
+            parts.append(text)
+            count += len(text)
+            if count >= max_chars:
+                complete = False
+                break
+        text = "".join(parts)
+        self._keep_prefix(text, complete)
+        return text[:max_chars]
+
+    def _keep_prefix(self, text, complete):
+        if self._prefix is None or len(text) > len(self._prefix):
+            self._prefix = text[:SAMPLE_SIZE]
+            self._complete = complete and len(text) <= SAMPLE_SIZE
+
+    def iter_lines(self, chunk_size=CHUNK_SIZE):
+        # Same lines as detector.iter_lines(self.read_text()), without holding
+        # the whole decoded file. A trailing "\r" is held back in case the
+        # next chunk starts with "\n".
+        if self._complete:
+            yield from detector.iter_lines(self._prefix)
+            return
+        pending = ""
+        for chunk in self.iter_chunks(chunk_size):
+            buf = pending + chunk
+            cut = max(buf.rfind("\n"), buf.rfind("\r"))
+            if cut == len(buf) - 1 and buf[cut] == "\r":
+                cut = max(buf.rfind("\n", 0, cut), buf.rfind("\r", 0, cut))
+            if cut < 0:
+                pending = buf
+                continue
+            yield from detector.iter_lines(buf[:cut + 1])
+            pending = buf[cut + 1:]
+        if pending:
+            yield from detector.iter_lines(pending)
+
+
+def open_source(path) -> FileSource:
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _sources_lock:
+        source = _SOURCES.get(key)
+        if source is not None:
+            _SOURCES.move_to_end(key)
+            return source
+
+        source = FileSource(path, st.st_mtime_ns, st.st_size)
+        _SOURCES[key] = source
+        while len(_SOURCES) > MAX_CACHED_SOURCES:
+            _SOURCES.popitem(last=False)
+        return source
+
+
+def read_text(path) -> str:
+    try:
+        return open_source(path).read_text()
+    except Exception:
+        return ""
+
+
+def clear_cache():
+    _SOURCES.clear()
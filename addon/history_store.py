@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import os
+import uuid
+from array import array
+
+from aqt import mw
+
+# Import history. Batches live in memory for the session; with "Remember
+# history" on they are also kept in user_files/history.jsonl, an append-only
+# log with one JSON event per line:
+#   {"op": "batch", "batch": {...}}            a new batch (with its "id")
+#   {"op": "remove", "id": ...}                a deleted batch
+#   {"op": "remove_notes", "nids": [...]}      deleted notes in any batch
+#   {"op": "expanded", "id": ..., "value": b}  tree expansion state
+#   {"op": "clear"}                            everything removed
+# Each change appends one short line instead of rewriting the history, and
+# the log is only read when the history is first needed. Once it holds many
+# more events than live batches it is compacted into one "batch" line each.
+#
+# A batch records its notes as an array('q') of note ids ("nids") plus the
+# first field of only the first PREVIEW_SAMPLE notes ("previews", nid ->
+# text cut to PREVIEW_CHARS + 1, the extra character marking a cut); other
+# previews are read from the collection when they are shown (fetch_previews).
+HISTORY_FILE_NAME = "history.jsonl"
+# Optional per-import tag, so the browser can find a batch with one search.
+BATCH_TAG_PREFIX = "CSVImportPlus"
+COMPACT_MIN_EVENTS = 200
+PREVIEW_SAMPLE = 50
+PREVIEW_CHARS = 150
+
+_state = {"store": None}
+
+
+def default_path():
+    try:
+        manager = mw.addonManager
+        folder = manager.addonsFolder(manager.addonFromModule(__name__))
+    except Exception:
+        return None
+    return os.path.join(folder, "user_files", HISTORY_FILE_NAME)
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def batch_tag(batch_id) -> str:
+    # e.g. CSVImportPlus::2026-10-18-143501-1a2b3c. No "_" or "*", which
+    # are wildcards in Anki searches.
+    stamp = datetime.datetime.now().strftime("%Y-%m-%d-%H%M%S")
+    return f"{BATCH_TAG_PREFIX}::{stamp}-{batch_id[:6]}"
+
+
+def browser_search(batches, nids=()):
+    # Search for whole batches (by their tag where they have one) plus
+    # single notes. Untagged batches fall back to listing their note ids.
+    terms = []
+    all_nids = set(nids)
+    for batch in batches:
+        if batch.get("tag"):
+            terms.append(f"tag:{batch['tag']}")
+        else:
+            all_nids.update(batch["nids"])
+    if all_nids:
+        terms.append(f"nid:{','.join(map(str, sorted(all_nids)))}")
+    return " or ".join(terms)
+
+
+def clip_preview(text: str) -> str:
+    # One character more than is shown, so format_preview() knows the text
+    # was cut.
+    return text[:PREVIEW_CHARS + 1]
+
+
+def format_preview(text: str) -> str:
+    if len(text) > PREVIEW_CHARS:
+        return text[:PREVIEW_CHARS] + "..."
+    return text
+
+
+class NoteLog:
+    # Notes written by one import, collected in the compact batch format.
+    def __init__(self):
+        self.nids = array("q")
+        self.previews = {}
+
+    def add(self, nid, preview):
+        if len(self.previews) < PREVIEW_SAMPLE:
+            self.previews[nid] = clip_preview(preview)
+        self.nids.append(nid)
+
+    def __len__(self):
+        return len(self.nids)
+
+
+def _encode(batch):
+    record = dict(batch)
+    record["nids"] = batch["nids"].tolist()
+    record["previews"] = [[nid, text] for nid, text in batch["previews"].items()]
+    return record
+
+
+def _decode(record):
+    batch = dict(record)
+    if "cards" in batch:
+        # Earlier format: one {"id": ..., "preview": ...} dict per note. Plain
+        # string entries carry no note id and are dropped.
+        log = NoteLog()
+        for card in batch.pop("cards") or ():
+            if isinstance(card, dict) and card.get("id") is not None:
+                log.add(card["id"], str(card.get("preview", "")))
+        batch["nids"] = log.nids
+        batch["previews"] = log.previews
+        batch["added"] = len(log)
+    else:
+        batch["nids"] = array("q", batch.get("nids") or ())
+        batch["previews"] = {nid: text for nid, text in batch.get("previews") or ()}
+    return batch
+
+
+def _to_json(event):
+    if event.get("op") == "batch":
+        event = {"op": "batch", "batch": _encode(event["batch"])}
+    return json.dumps(event, ensure_ascii=False)
+
+
+def fetch_previews(nids):
+    # First fields of the given notes, read from the collection in chunks.
+    previews = {}
+    col = getattr(mw, "col", None)
+    if col is None:
+        return previews
+    nids = list(nids)
+    for start in range(0, len(nids), 500):
+        chunk = nids[start:start + 500]
+        try:
+            rows = col.db.all(
+                "select id, flds from notes where id in (%s)" % ",".join(str(int(n)) for n in chunk)
+            )
+        except Exception:
+            continue
+        for nid, flds in rows:
+            previews[nid] = clip_preview(flds.split("\x1f", 1)[0])
+    return previews
+
+
+class HistoryStore:
+    def __init__(self, path=None, persistent=False):
+        self.path = path
+        self.persistent = persistent
+        self._batches = None
+        self._by_id = {}
+        # nid -> ids of the batches holding it, built on first deletion.
+        self._nid_index = None
+        self._events = 0
+
+    # ---- reading ----
+    def batches(self) -> list:
+        # Oldest first. Loaded on first use.
+        if self._batches is None:
+            self._batches = []
+            if self.persistent:
+                self._load()
+        return self._batches
+
+    def get(self, batch_id):
+        self.batches()
+        return self._by_id.get(batch_id)
+
+    def batch_ids_for(self, nids):
+        # Ids of the batches holding any of the notes.
+        self.batches()
+        if self._nid_index is None:
+            index = {}
+            for batch in self._batches:
+                for nid in batch["nids"]:
+                    index.setdefault(nid, []).append(batch["id"])
+            self._nid_index = index
+        found = []
+        for nid in nids:
+            for batch_id in self._nid_index.get(nid, ()):
+                if batch_id not in found:
+                    found.append(batch_id)
+        return found
+
+    def _load(self):
+        torn = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # A last line without its newline was cut short; the
+                    # next append would be glued onto it.
+                    torn = not line.endswith("\n")
+                    try:
+                        event = json.loads(line)
+                        if event.get("op") == "batch":
+                            event["batch"] = _decode(event["batch"])
+                    except Exception:
+                        # A line cut short by a crash; the rest still applies.
+                        continue
+                    self._apply(event)
+                    self._events += 1
+        except Exception:
+            return
+        if torn or self._events > max(COMPACT_MIN_EVENTS, 2 * len(self._batches)):
+            self.compact()
+
+    def _apply(self, event):
+        op = event.get("op")
+        if op == "batch":
+            batch = event.get("batch") or {}
+            batch.setdefault("id", new_batch_id())
+            if batch["id"] in self._by_id:
+                self._drop(self._by_id[batch["id"]])
+            self._batches.append(batch)
+            self._by_id[batch["id"]] = batch
+            if self._nid_index is not None:
+                for nid in batch["nids"]:
+                    self._nid_index.setdefault(nid, []).append(batch["id"])
+        elif op == "remove":
+            batch = self._by_id.get(event.get("id"))
+            if batch is not None:
+                self._drop(batch)
+        elif op == "remove_notes":
+            nids = set(event.get("nids") or ())
+            for batch_id in self.batch_ids_for(nids):
+                batch = self._by_id[batch_id]
+                batch["nids"] = array("q", (n for n in batch["nids"] if n not in nids))
+                for nid in nids.intersection(batch["previews"]):
+                    del batch["previews"][nid]
+                batch["added"] = len(batch["nids"])
+                if not batch["nids"]:
+                    self._drop(batch)
+            for nid in nids:
+                self._nid_index.pop(nid, None)
+        elif op == "expanded":
+            batch = self._by_id.get(event.get("id"))
+            if batch is not None:
+                batch["expanded"] = bool(event.get("value"))
+        elif op == "clear":
+            self._batches.clear()
+            self._by_id.clear()
+            self._nid_index = None
+
+    def _drop(self, batch):
+        self._batches.remove(batch)
+        del self._by_id[batch["id"]]
+        if self._nid_index is not None:
+            for nid in batch["nids"]:
+                ids = self._nid_index.get(nid)
+                if ids and batch["id"] in ids:
+                    ids.remove(batch["id"])
+                    if not ids:
+                        del self._nid_index[nid]
+
+    # ---- changes ----
+    def add_batch(self, batch) -> str:
+        batch.setdefault("id", new_batch_id())
+        self._record({"op": "batch", "batch": batch})
+        return batch["id"]
+
+    def remove_batch(self, batch_id):
+        self._record({"op": "remove", "id": batch_id})
+
+    def remove_notes(self, nids):
+        # Drops deleted notes from every batch holding them and returns the
+        # ids of those batches. Batches left empty are logged as removed, so
+        # deleting a whole batch does not write all of its note ids.
+        nids = set(nids)
+        affected = self.batch_ids_for(nids)
+        emptied = []
+        partial = set()
+        for batch_id in affected:
+            batch_nids = self._by_id[batch_id]["nids"]
+            if all(nid in nids for nid in batch_nids):
+                emptied.append(batch_id)
+            else:
+                partial.update(nid for nid in batch_nids if nid in nids)
+        for batch_id in emptied:
+            self._record({"op": "remove", "id": batch_id})
+        if partial:
+            self._record({"op": "remove_notes", "nids": sorted(partial)})
+        return affected
+
+    def set_expanded(self, batch_id, expanded):
+        batch = self.get(batch_id)
+        if batch is None or bool(batch.get("expanded")) == bool(expanded):
+            return
+        self._record({"op": "expanded", "id": batch_id, "value": bool(expanded)})
+
+    def clear(self):
+        self.batches()
+        self._apply({"op": "clear"})
+        if self.persistent:
+            self.compact()
+
+    def migrate(self, legacy_batches):
+        # History saved by older versions in the add-on config.
+        if not self.persistent or not legacy_batches:
+            return
+        if self.batches():
+            return
+        for record in legacy_batches:
+            if isinstance(record, dict) and isinstance(record.get("cards"), list):
+                batch = _decode(record)
+                if batch["nids"]:
+                    self._apply({"op": "batch", "batch": batch})
+        self.compact()
+
+    def set_persistent(self, persistent):
+        # Turning persistence on writes the session history to disk; turning
+        # it off deletes the file.
+        persistent = bool(persistent) and self.path is not None
+        if persistent == self.persistent:
+            return
+        self.persistent = persistent
+        if persistent:
+            # Not loaded yet: the log is read on first use instead.
+            self.compact()
+        else:
+            try:
+                os.remove(self.path)
+            except Exception:
+                pass
+            self._events = 0
+
+    def _record(self, event):
+        self.batches()
+        self._apply(event)
+        if not self.persistent:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(_to_json(event) + "\n")
+            self._events += 1
+        except Exception:
+            return
+        if self._events > max(COMPACT_MIN_EVENTS, 2 * len(self._batches)):
+            self.compact()
+
+    def compact(self):
+        # Rewrite the log as one "batch" event per live batch.
+        if not self.persistent or self._batches is None:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for batch in self._batches:
+                    f.write(_to_json({"op": "batch", "batch": batch}) + "\n")
+            os.replace(tmp_path, self.path)
+            self._events = len(self._batches)
+        except Exception:
+            pass
+
+
+def get_store() -> HistoryStore:
+    # The session's history. Persistence follows the "remember_history"
+    # config key; history that older versions kept in the config under
+    # "saved_history" is moved into the log the first time.
+    if _state["store"] is None:
+        store = HistoryStore(default_path())
+        try:
+            manager = mw.addonManager
+            name = manager.addonFromModule(__name__)
+            config = manager.getConfig(name) or {}
+        except Exception:
+            manager = config = None
+        if config is not None:
+            store.set_persistent(config.get("remember_history", False))
+            if "saved_history" in config:
+                store.migrate(config.pop("saved_history"))
+                try:
+                    manager.writeConfig(name, config)
+                except Exception:
+                    pass
+        _state["store"] = store
+    return _state["store"]
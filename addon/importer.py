@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
-import csv
-import io
+import html
+import itertools
 import os
 import tempfile
 import datetime
+from array import array
+from concurrent.futures import Future
 
 try:
     from aqt import mw
@@ -15,10 +17,31 @@ except Exception:  # pragma: no cover - fallback for tests
     def showWarning(_msg):
         pass
 
+try:
+    from anki.collection import AddNoteRequest
+except Exception:  # pragma: no cover - Anki < 23.10 has no batched add_notes
+    AddNoteRequest = None
+
 from . import detector
+from . import duplicates
+from . import history_store
+from . import parsers
 from . import anki_helpers
 
+# Rows parsed and written per step; bounds peak memory on huge inputs.
+DEFAULT_BATCH_SIZE = 500
+
 _PENDING_IMPORT_CLEANUP = set()
+
+
+class ImportFailed(Exception):
+    pass
+
+
+class ImportCancelled(Exception):
+    pass
+
+
 _IMPORT_DIALOG_HOOKED = False
 
 
@@ -127,7 +150,313 @@ def open_with_default_importer(raw_content, deck_combo, deck_infos):
             _safe_unlink(path)
 
 
-def do_import(
+def _iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _iter_raw_lines(raw_content):
+    # raw_content is either text or a file_source.FileSource streamed from disk.
+    if isinstance(raw_content, str):
+        return detector.iter_lines(raw_content)
+    return raw_content.iter_lines()
+
+
+def _iter_csv_rows(raw_content, delimiter):
+    # Parse lazily straight from the raw text; no stripped copy and no row list.
+    lines = detector.iter_data_lines(_iter_raw_lines(raw_content))
+    return iter(parsers.iter_rows(lines, delimiter))
+
+
+def _data_sample(raw_content, size=2048):
+    sample = []
+    length = 0
+    for line in detector.iter_data_lines(_iter_raw_lines(raw_content)):
+        sample.append(line)
+        length += len(line)
+        if length >= size:
+            break
+    return "".join(sample)
+
+
+def _html_value(val):
+    return val.strip().replace("\r\n", "<br>").replace("\n", "<br>")
+
+
+def _escaped_value(val):
+    return html.escape(val.strip()).replace("\r\n", "<br>").replace("\n", "<br>")
+
+
+# Joins a column's cells so each substitution runs once per column instead of
+# once per cell. Anki uses it as its own field separator, so field text should
+# never contain it; columns that do are transformed cell by cell.
+COLUMN_SEPARATOR = "\x1f"
+
+
+def transform_column(values, allow_html):
+    # Column-at-a-time equivalent of [_html_value(v) or _escaped_value(v) ...].
+    if not values:
+        return []
+    buf = COLUMN_SEPARATOR.join([v.strip() for v in values])
+    if buf.count(COLUMN_SEPARATOR) != len(values) - 1:
+        transform = _html_value if allow_html else _escaped_value
+        return [transform(v) for v in values]
+    if not allow_html:
+        buf = html.escape(buf)
+    buf = buf.replace("\r\n", "<br>").replace("\n", "<br>")
+    return buf.split(COLUMN_SEPARATOR)
+
+
+class ImportPlan:
+    # Column -> field assignments resolved once per import, so the row loop
+    # only indexes and transforms. Shared by the add and update paths.
+    def __init__(self, field_names, field_mapping, allow_html):
+        transform = _html_value if allow_html else _escaped_value
+        self.allow_html = allow_html
+        self.transform = transform
+        self.field_count = len(field_names)
+
+        # A mapping only counts if at least one field is mapped to a column.
+        if field_mapping and not any(
+            field_mapping.get(f_name) is not None for f_name in field_names
+        ):
+            field_mapping = None
+        self.mapped = bool(field_mapping)
+
+        if field_mapping:
+            # (column index, field index, transform)
+            self.columns = [
+                (field_mapping[f_name], f_idx, transform)
+                for f_idx, f_name in enumerate(field_names)
+                if field_mapping.get(f_name) is not None
+            ]
+            first_col = field_mapping.get(field_names[0]) if field_names else None
+            self.key_col = first_col if first_col is not None else 0
+            self.tags_col = field_mapping.get("Tags")
+        else:
+            self.columns = [(i, i, transform) for i in range(len(field_names))]
+            self.key_col = 0
+            self.tags_col = None
+
+    def prepare(self, row):
+        # Everything about one row that does not need the collection: its
+        # duplicate key, (field index, value) pairs and tags from the CSV.
+        # Returns None for empty rows.
+        if not row or all(not c.strip() for c in row):
+            return None
+
+        width = len(row)
+        fields = [
+            (f_idx, transform(row[col_idx]))
+            for col_idx, f_idx, transform in self.columns
+            if col_idx < width
+        ]
+
+        row_tags = []
+        if self.mapped:
+            if self.tags_col is not None and self.tags_col < width:
+                row_tags = row[self.tags_col].split()
+        elif width > self.field_count:
+            # Positional mode: an extra trailing column holds tags.
+            row_tags = row[-1].split()
+
+        key = self.transform(row[self.key_col]) if width > self.key_col else ""
+        return key, fields, row_tags
+
+    def prepare_batch(self, rows):
+        # Same result as [self.prepare(row) for row in rows]. With HTML
+        # escaping on, the transforms are applied a whole column at a time,
+        # which saves one html.escape() call per cell; without it the joined
+        # buffer only adds work, so rows are prepared one by one.
+        if self.allow_html:
+            return [self.prepare(row) for row in rows]
+        kept = [row for row in rows if row and any(c.strip() for c in row)]
+        if not kept:
+            return [None] * len(rows)
+
+        # Transformed values per source column; short rows get "".
+        wanted = {col_idx for col_idx, _, _ in self.columns}
+        wanted.add(self.key_col)
+        columns = {}
+        for col_idx in wanted:
+            columns[col_idx] = transform_column(
+                [row[col_idx] if col_idx < len(row) else "" for row in kept],
+                self.allow_html,
+            )
+        key_values = columns[self.key_col]
+
+        prepared = []
+        i = 0
+        for row in rows:
+            if not row or all(not c.strip() for c in row):
+                prepared.append(None)
+                continue
+            width = len(row)
+            fields = [
+                (f_idx, columns[col_idx][i])
+                for col_idx, f_idx, _ in self.columns
+                if col_idx < width
+            ]
+            row_tags = []
+            if self.mapped:
+                if self.tags_col is not None and self.tags_col < width:
+                    row_tags = row[self.tags_col].split()
+            elif width > self.field_count:
+                row_tags = row[-1].split()
+            prepared.append((key_values[i], fields, row_tags))
+            i += 1
+        return prepared
+
+
+def _log_note(note_log, note, empty_label):
+    note_log.add(note.id, note.fields[0] if len(note.fields) > 0 else empty_label)
+
+
+def _write_batch(notes_to_update, notes_to_add, deck_id, note_log, added_nids, added_keys=None):
+    # One backend call per batch where the running Anki supports it, with the
+    # old one-note-at-a-time path as fallback. Ids of added notes go to
+    # added_nids and, when a list is given, their first fields to added_keys.
+    added = 0
+    updated = 0
+
+    # Save updated notes
+    written = []
+    if notes_to_update and hasattr(mw.col, "update_notes"):
+        try:
+            mw.col.update_notes(notes_to_update)
+            written = notes_to_update
+        except Exception:
+            written = []
+    if not written:
+        for note in notes_to_update:
+            try:
+                if hasattr(mw.col, "update_note"):
+                    mw.col.update_note(note)
+                else:
+                    note.flush()
+                written.append(note)
+            except Exception:
+                pass
+    for note in written:
+        updated += 1
+        _log_note(note_log, note, "Updated Note")
+
+    # Save new notes
+    written = []
+    if notes_to_add and AddNoteRequest is not None and hasattr(mw.col, "add_notes"):
+        try:
+            mw.col.add_notes(
+                [AddNoteRequest(note=note, deck_id=deck_id) for note in notes_to_add]
+            )
+            written = notes_to_add
+        except Exception:
+            written = []
+    if not written:
+        for note in notes_to_add:
+            try:
+                mw.col.add_note(note, deck_id)
+                written.append(note)
+            except Exception:
+                pass
+    for note in written:
+        added += 1
+        added_nids.append(note.id)
+        if added_keys is not None:
+            first_field = note.fields[0].strip() if len(note.fields) > 0 else ""
+            added_keys.append((first_field, note.id))
+        _log_note(note_log, note, "Empty Note")
+
+    return added, updated
+
+
+def _begin_undo(label="CSV Import"):
+    # Merge operations in modern Anki for native batch Ctrl+Z
+    if hasattr(mw.col, "add_custom_undo_entry") and hasattr(mw.col, "merge_undo_entries"):
+        try:
+            return mw.col.add_custom_undo_entry(label)
+        except Exception:
+            return None
+    mw.checkpoint("CSV Import Plus")
+    return None
+
+
+def _end_undo(undo_entry):
+    # Folds the steps since undo_entry into it; returns the OpChanges.
+    if undo_entry is not None:
+        try:
+            return mw.col.merge_undo_entries(undo_entry)
+        except Exception:
+            pass
+    return None
+
+
+def _undo_is_ours(undo_entry):
+    # Whether undo_entry is still the newest undo step, i.e. nothing else
+    # was done since it was last merged. Steps taken elsewhere must not be
+    # folded into the import or undone with it. Assumed true where Anki
+    # does not report the newest step.
+    try:
+        return mw.col.undo_status().last_step == undo_entry
+    except Exception:
+        return True
+
+
+def _notify_changes(changes):
+    # What CollectionOp does after an op, so the browser and main window
+    # refresh. Safe to call from the import thread.
+    if changes is None:
+        return
+    try:
+        from aqt import gui_hooks
+    except Exception:
+        return
+    run_on_main(lambda: gui_hooks.operation_did_execute(changes, None))
+
+
+def _rollback_import(undo_entry, added_nids):
+    if undo_entry is not None and _undo_is_ours(undo_entry):
+        try:
+            _notify_changes(getattr(mw.col.undo(), "changes", None))
+            return
+        except Exception:
+            pass
+    if added_nids:
+        nids = list(added_nids)
+        try:
+            mw.col.remove_notes(nids)
+        except Exception:
+            try:
+                mw.col.remNotes(nids)
+            except Exception:
+                pass
+
+
+def remove_notes(nids, label="Delete Imported Notes"):
+    # Delete notes with one backend call under one undo step, so Ctrl+Z
+    # brings back everything deleted together. Returns whether it worked.
+    nids = list(nids)
+    if not nids:
+        return False
+    undo_entry = _begin_undo(label)
+    removed = True
+    try:
+        mw.col.remove_notes(nids)
+    except Exception:
+        try:
+            mw.col.remNotes(nids)
+        except Exception:
+            removed = False
+    _notify_changes(_end_undo(undo_entry))
+    return removed
+
+
+def prepare_import(
     raw_content,
     deck_combo,
     deck_infos,
@@ -141,12 +470,14 @@ def do_import(
     tag_all="",
     tag_updated="",
     field_mapping=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    duplicate_lookup="index",
+    batch_tag=False,
 ):
+    # Resolve everything that needs the dialog widgets up front, so the job can
+    # run on a background thread afterwards.
     if not raw_content:
-        showWarning("Provide CSV via Paste or choose a CSV file first.")
-        return
-
-    csv_content = detector.strip_directive_lines(raw_content)
+        raise ImportFailed("Provide CSV via Paste or choose a CSV file first.")
 
     deck_idx = deck_combo.currentIndex()
     if deck_idx < 0:
@@ -156,253 +487,314 @@ def do_import(
     model_id = anki_helpers.model_id_from_index(model_infos, model_idx)
 
     if deck_id is None:
-        showWarning("Could not resolve target deck.")
-        return
+        raise ImportFailed("Could not resolve target deck.")
     if model_id is None:
-        showWarning("Could not resolve note type.")
-        return
+        raise ImportFailed("Could not resolve note type.")
 
     try:
         notetype = mw.col.models.get(model_id)
-        if not notetype:
-            showWarning("Selected note type not found.")
-            return
+    except Exception as e:
+        raise ImportFailed(f"Import failed: {str(e)}")
+    if not notetype:
+        raise ImportFailed("Selected note type not found.")
+
+    batch_id = history_store.new_batch_id()
+    return {
+        "batch_id": batch_id,
+        "batch_tag": history_store.batch_tag(batch_id) if batch_tag else "",
+        "raw_content": raw_content,
+        "deck_id": deck_id,
+        "deck_name": deck_combo.currentText(),
+        "model_id": model_id,
+        "notetype": notetype,
+        "delimiter": get_delimiter(delimiter_combo, _data_sample(raw_content)),
+        "used_auto_delimiter": delimiter_combo.currentIndex() == 0,
+        "has_header": header_check.isChecked(),
+        "allow_html": allow_html,
+        "existing_notes_index": existing_notes_index,
+        "match_scope_index": match_scope_index,
+        "tag_all": tag_all,
+        "tag_updated": tag_updated,
+        "field_mapping": field_mapping,
+        "batch_size": max(1, batch_size),
+        "duplicate_lookup": duplicate_lookup,
+    }
 
-        delimiter = get_delimiter(delimiter_combo, csv_content)
-        reader = csv.reader(io.StringIO(csv_content), delimiter=delimiter)
-        rows = [r for r in reader]
-        if not rows:
-            showWarning("No data rows found.")
-            return
 
-        if header_check.isChecked():
-            rows = rows[1:]
-            if not rows:
-                showWarning("No data rows found after skipping header row.")
-                return
+def iter_prepared_batches(job):
+    # Parse/transform stage of an import. It never touches the collection, so
+    # bulk imports run it on worker threads ahead of the single writer.
+    rows = _iter_csv_rows(job["raw_content"], job["delimiter"])
+    first_row = next(rows, None)
+    if first_row is None:
+        raise ImportFailed("No data rows found.")
+
+    if job["has_header"]:
+        first_row = next(rows, None)
+        if first_row is None:
+            raise ImportFailed("No data rows found after skipping header row.")
+    rows = itertools.chain([first_row], rows)
+
+    plan = ImportPlan(
+        [f["name"] for f in job["notetype"]["flds"]],
+        job["field_mapping"],
+        job["allow_html"],
+    )
+    for batch in _iter_batches(rows, job["batch_size"]):
+        yield plan.prepare_batch(batch)
+
+
+def run_import_job(job, progress=None, is_cancelled=None, batches=None):
+    # Collection work only: safe to call from a background thread. Raises
+    # ImportCancelled (after rolling back) if is_cancelled() turns true.
+    # batches are the output of iter_prepared_batches(job), possibly produced
+    # on another thread; by default they are produced inline.
+    deck_id = job["deck_id"]
+    model_id = job["model_id"]
+    notetype = job["notetype"]
+    existing_notes_index = job["existing_notes_index"]
+    match_scope_index = job["match_scope_index"]
+
+    if batches is None:
+        batches = iter_prepared_batches(job)
+    # Surface parse errors (no data rows, ...) before any collection work.
+    batches = iter(batches)
+    first_batch = next(batches, None)
+    if first_batch is None:
+        raise ImportFailed("No data rows found.")
+    batches = itertools.chain([first_batch], batches)
+
+    mw.col.decks.select(deck_id)
+
+    # First-field lookup for duplicate checking if mode is Update or Preserve
+    existing_notes = None
+    if existing_notes_index in (0, 1) and mw is not None:
+        scope_deck_id = deck_id if match_scope_index == 1 else None
+        if job["duplicate_lookup"] == "sql":
+            existing_notes = duplicates.SqlDuplicateLookup(model_id, scope_deck_id)
+        else:
+            existing_notes = duplicates.get_index(mw.col, model_id, scope_deck_id)
+
+    added = 0
+    updated = 0
+    skipped_empty = 0
+    rows_done = 0
+
+    tags_all_list = [t for t in job["tag_all"].strip().split() if t]
+    if job.get("batch_tag"):
+        tags_all_list.append(job["batch_tag"])
+    tags_updated_list = [t for t in job["tag_updated"].strip().split() if t]
+
+    note_log = history_store.NoteLog()
+    # Added note ids, for a rollback; the set only excludes them from the
+    # duplicate lookups of later batches.
+    added_nids = array("q")
+    excluded_nids = set()
+    undo_started = False
+    undo_entry = None
+    changes = None
 
-        field_names = [f["name"] for f in notetype["flds"]]
+    try:
+        # Rows are parsed, turned into notes and written one batch at a time, so
+        # memory stays bounded by batch_size instead of the size of the input.
+        for batch in batches:
+            notes_to_add = []
+            notes_to_update = []
+
+            if existing_notes is not None:
+                existing_notes.prefetch(
+                    mw.col,
+                    [prepared[0] for prepared in batch if prepared is not None],
+                    exclude_nids=excluded_nids,
+                )
 
-        # Check if field_mapping is valid (at least one field mapped to a column index)
-        is_mapping_valid = False
-        if field_mapping:
-            for f_name in field_names:
-                col_idx = field_mapping.get(f_name)
-                if col_idx is not None:
-                    is_mapping_valid = True
-                    break
-        if not is_mapping_valid:
-            field_mapping = None
+            for prepared in batch:
+                if is_cancelled is not None and is_cancelled():
+                    raise ImportCancelled()
+                rows_done += 1
+                if prepared is None:
+                    skipped_empty += 1
+                    continue
+                key, fields, row_tags = prepared
 
-        mw.col.decks.select(deck_id)
-
-        # Retrieve existing notes for duplicate checking if mode is Update or Preserve
-        existing_notes = {}
-        if existing_notes_index in (0, 1) and mw is not None:
-            if match_scope_index == 1:
-                # Same note type and deck
-                db_rows = mw.col.db.all(
-                    "select distinct n.id, n.flds from notes n "
-                    "join cards c on n.id = c.nid "
-                    "where n.mid = ? and c.did = ?",
-                    model_id, deck_id
-                )
-            else:
-                # Same note type
-                db_rows = mw.col.db.all(
-                    "select id, flds from notes where mid = ?", model_id
-                )
-            
-            for nid, flds in db_rows:
-                first_fld = flds.split("\x1f")[0]
-                existing_notes[first_fld.strip()] = nid
+                existing_note_id = None
+                if existing_notes is not None:
+                    existing_note_id = existing_notes.lookup(key)
 
-        added = 0
-        updated = 0
-        skipped_empty = 0
-        notes_to_add = []
-        notes_to_update = []
+                if existing_note_id is not None:
+                    if existing_notes_index == 1:
+                        # Preserve: do nothing, skip this row
+                        continue
+                    elif existing_notes_index == 0:
+                        # Update: update existing note
+                        try:
+                            note = mw.col.get_note(existing_note_id)
+                            for f_idx, val_str in fields:
+                                note.fields[f_idx] = val_str
+
+                            # Add tags
+                            for tag in tags_all_list + tags_updated_list:
+                                if tag not in note.tags:
+                                    note.tags.append(tag)
+
+                            notes_to_update.append(note)
+                            continue
+                        except Exception:
+                            pass
+
+                # Duplicate/Create New Note
+                note = mw.col.new_note(notetype)
+                for f_idx, val_str in fields:
+                    note.fields[f_idx] = val_str
+
+                for tag in row_tags + tags_all_list:
+                    if tag not in note.tags:
+                        note.tags.append(tag)
+
+                notes_to_add.append(note)
+
+            if is_cancelled is not None and is_cancelled():
+                raise ImportCancelled()
+            col_mod_before = duplicates.collection_mod(mw.col)
+            if not undo_started:
+                undo_entry = _begin_undo()
+                undo_started = True
+            elif undo_entry is not None and not _undo_is_ours(undo_entry):
+                # Something else made an undo step meanwhile: leave it out of
+                # the import's entry; a cancel then deletes the added notes.
+                undo_entry = None
+            # First fields are only kept while a cached index can use them.
+            added_keys = [] if duplicates.has_cached_index(mw.col, model_id) else None
+            batch_added, batch_updated = _write_batch(
+                notes_to_update, notes_to_add, deck_id, note_log, added_nids, added_keys
+            )
+            # Merged per batch, so the check above sees only foreign steps.
+            changes = _end_undo(undo_entry)
+            duplicates.record_added(mw.col, model_id, deck_id, added_keys or (), col_mod_before)
+            added += batch_added
+            updated += batch_updated
+            excluded_nids.update(added_nids[len(added_nids) - batch_added:])
+            if progress is not None:
+                progress(rows_done)
+    except Exception:
+        # Cancelled or failed: take back what was written so far.
+        if undo_started:
+            _rollback_import(undo_entry, added_nids)
+            duplicates.clear_cache()
+        raise
+
+    _notify_changes(changes)
+
+    return {
+        "added": added,
+        "updated": updated,
+        "skipped_empty": skipped_empty,
+        "notes": note_log,
+    }
 
-        tags_all_list = [t for t in tag_all.strip().split() if t]
-        tags_updated_list = [t for t in tag_updated.strip().split() if t]
 
-        for row in rows:
-            if not row or all(not c.strip() for c in row):
-                skipped_empty += 1
-                continue
+def finish_import(job, result):
+    # Main-thread bookkeeping after a successful run_import_job().
+    if (result["added"] + result["updated"]) > 0:
+        now_str = datetime.datetime.now().strftime("%I:%M %p")
+        batch = {
+            "id": job.get("batch_id") or history_store.new_batch_id(),
+            "time": now_str,
+            "deck_name": job["deck_name"],
+            "notetype_name": job["notetype"].get("name", "Unknown"),
+            "expanded": False,
+            "added": result["added"],
+            "updated": result["updated"],
+            "nids": result["notes"].nids,
+            "previews": result["notes"].previews,
+        }
+        if job.get("batch_tag"):
+            batch["tag"] = job["batch_tag"]
+        history_store.get_store().add_batch(batch)
+    return {
+        "added": result["added"],
+        "updated": result["updated"],
+        "skipped_empty": result["skipped_empty"],
+        "deck_name": job["deck_name"],
+        "used_auto_delimiter": job["used_auto_delimiter"],
+        "delimiter_name": detector.get_delimiter_name(job["delimiter"]),
+    }
 
-            # Determine key (first field processed)
-            first_field_col_idx = 0
-            if field_mapping and len(field_names) > 0:
-                mapped_idx = field_mapping.get(field_names[0])
-                if mapped_idx is not None:
-                    first_field_col_idx = mapped_idx
-
-            first_val = row[first_field_col_idx].strip() if len(row) > first_field_col_idx else ""
-            if not allow_html:
-                import html
-                first_val_processed = html.escape(first_val).replace("\r\n", "<br>").replace("\n", "<br>")
-            else:
-                first_val_processed = first_val.replace("\r\n", "<br>").replace("\n", "<br>")
-
-            existing_note_id = existing_notes.get(first_val_processed)
-
-            if existing_note_id is not None:
-                if existing_notes_index == 1:
-                    # Preserve: do nothing, skip this row
-                    continue
-                elif existing_notes_index == 0:
-                    # Update: update existing note
-                    try:
-                        note = mw.col.get_note(existing_note_id)
-                        if field_mapping:
-                            for f_idx, f_name in enumerate(field_names):
-                                col_idx = field_mapping.get(f_name)
-                                if col_idx is not None and col_idx < len(row):
-                                    val_str = row[col_idx].strip()
-                                    if not allow_html:
-                                        import html
-                                        val_str = html.escape(val_str)
-                                    val_str = val_str.replace("\r\n", "<br>").replace("\n", "<br>")
-                                    note.fields[f_idx] = val_str
-                        else:
-                            for i, val in enumerate(row[: len(field_names)]):
-                                val_str = val.strip()
-                                if not allow_html:
-                                    import html
-                                    val_str = html.escape(val_str)
-                                val_str = val_str.replace("\r\n", "<br>").replace("\n", "<br>")
-                                note.fields[i] = val_str
-
-                        # Add tags
-                        for tag in tags_all_list + tags_updated_list:
-                            if tag not in note.tags:
-                                note.tags.append(tag)
-
-                        notes_to_update.append(note)
-                        continue
-                    except Exception:
-                        pass
-
-            # Duplicate/Create New Note
-            note = mw.col.new_note(notetype)
-            if field_mapping:
-                for f_idx, f_name in enumerate(field_names):
-                    col_idx = field_mapping.get(f_name)
-                    if col_idx is not None and col_idx < len(row):
-                        val_str = row[col_idx].strip()
-                        if not allow_html:
-                            import html
-                            val_str = html.escape(val_str)
-                        val_str = val_str.replace("\r\n", "<br>").replace("\n", "<br>")
-                        note.fields[f_idx] = val_str
-            else:
-                for i, val in enumerate(row[: len(field_names)]):
-                    val_str = val.strip()
-                    if not allow_html:
-                        import html
-                        val_str = html.escape(val_str)
-                    val_str = val_str.replace("\r\n", "<br>").replace("\n", "<br>")
-                    note.fields[i] = val_str
-
-            if field_mapping:
-                tags_col_idx = field_mapping.get("Tags")
-                if tags_col_idx is not None and tags_col_idx < len(row):
-                    tags_val = row[tags_col_idx].strip()
-                    if tags_val:
-                        for t in tags_val.split():
-                            if t not in note.tags:
-                                note.tags.append(t)
-            else:
-                if len(row) > len(field_names):
-                    tags = row[-1].strip()
-                    if tags:
-                        for t in tags.split():
-                            if t not in note.tags:
-                                note.tags.append(t)
-
-            for tag in tags_all_list:
-                if tag not in note.tags:
-                    note.tags.append(tag)
-
-            notes_to_add.append(note)
 
+def do_import(
+    raw_content,
+    deck_combo,
+    deck_infos,
+    notetype_combo,
+    model_infos,
+    header_check,
+    delimiter_combo,
+    allow_html=True,
+    existing_notes_index=2,
+    match_scope_index=0,
+    tag_all="",
+    tag_updated="",
+    field_mapping=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    duplicate_lookup="index",
+    batch_tag=False,
+):
+    try:
+        job = prepare_import(
+            raw_content,
+            deck_combo,
+            deck_infos,
+            notetype_combo,
+            model_infos,
+            header_check,
+            delimiter_combo,
+            allow_html=allow_html,
+            existing_notes_index=existing_notes_index,
+            match_scope_index=match_scope_index,
+            tag_all=tag_all,
+            tag_updated=tag_updated,
+            field_mapping=field_mapping,
+            batch_size=batch_size,
+            duplicate_lookup=duplicate_lookup,
+            batch_tag=batch_tag,
+        )
         mw.progress.start()
-        
-        # Merge operations in modern Anki for native batch Ctrl+Z
-        use_bulk_undo = hasattr(mw.col, "add_custom_undo_entry") and hasattr(mw.col, "merge_undo_entries")
-        undo_entry = None
-        if use_bulk_undo:
-            try:
-                undo_entry = mw.col.add_custom_undo_entry("CSV Import")
-            except Exception:
-                pass
-        else:
-            mw.checkpoint("CSV Import Plus")
+        try:
+            result = run_import_job(job)
+        finally:
+            mw.progress.finish()
+    except ImportFailed as e:
+        showWarning(str(e))
+        return None
+    except Exception as e:
+        showWarning(f"Import failed: {str(e)}")
+        return None
 
-        added_cards_previews = []
+    mw.reset()
+    return finish_import(job, result)
 
-        # Save updated notes
-        for note in notes_to_update:
-            try:
-                if hasattr(mw.col, "update_note"):
-                    mw.col.update_note(note)
-                else:
-                    note.flush()
-                updated += 1
-                if len(note.fields) > 0:
-                    added_cards_previews.append({"id": note.id, "preview": note.fields[0]})
-                else:
-                    added_cards_previews.append({"id": note.id, "preview": "Updated Note"})
-            except Exception:
-                pass
 
-        # Save new notes
-        for note in notes_to_add:
-            try:
-                mw.col.add_note(note, deck_id)
-                added += 1
-                if len(note.fields) > 0:
-                    added_cards_previews.append({"id": note.id, "preview": note.fields[0]})
-                else:
-                    added_cards_previews.append({"id": note.id, "preview": "Empty Note"})
-            except Exception as e:
-                pass
+def run_in_background(task, on_done):
+    # Run task() on Anki's task manager and call on_done(future) on the main
+    # thread. Without a task manager (older Anki, tests) it runs inline.
+    taskman = getattr(mw, "taskman", None)
+    if taskman is not None:
+        taskman.run_in_background(task, on_done)
+        return
+    future = Future()
+    try:
+        future.set_result(task())
+    except BaseException as e:
+        future.set_exception(e)
+    on_done(future)
 
-        if use_bulk_undo and undo_entry is not None:
-            try:
-                mw.col.merge_undo_entries(undo_entry)
-            except Exception:
-                pass
 
-        mw.progress.finish()
-        mw.reset()
-
-        deck_name = deck_combo.currentText()
-        if (added + updated) > 0:
-            if not hasattr(mw, "csv_import_plus_history"):
-                mw.csv_import_plus_history = []
-            now_str = datetime.datetime.now().strftime("%I:%M %p")
-            mw.csv_import_plus_history.append({
-                "time": now_str,
-                "deck_name": deck_name,
-                "notetype_name": notetype.get("name", "Unknown"),
-                "expanded": False,
-                "added": added,
-                "updated": updated,
-                "cards": added_cards_previews
-            })
-        return {
-            "added": added,
-            "updated": updated,
-            "skipped_empty": skipped_empty,
-            "deck_name": deck_name,
-            "used_auto_delimiter": delimiter_combo.currentIndex() == 0,
-            "delimiter_name": detector.get_delimiter_name(delimiter),
-        }
-    except Exception as e:
-        showWarning(f"Import failed: {str(e)}")
-        return None
+def run_on_main(func):
+    taskman = getattr(mw, "taskman", None)
+    if taskman is not None:
+        taskman.run_on_main(func)
+    else:
+        func()
 
 
 def get_delimiter(delimiter_combo, content):
@@ -410,8 +802,7 @@ def get_delimiter(delimiter_combo, content):
     if delimiter_combo.currentIndex() == 0 or selection.startswith("Auto-detect"):
         if content:
             try:
-                delimiter, _ = detector.detect_csv_format(content)
-                return delimiter
+                return detector.sniff_delimiter(content)
             except Exception:
                 return ","
         return ","
@@ -1,7 +1,5 @@
 import os
 import json
-import csv
-import io
 from aqt import mw, gui_hooks
 from aqt.utils import openLink
 from aqt.qt import (
@@ -12,29 +10,15 @@ from aqt.qt import (
     Qt,
 )
 
+from . import detector
 from .dialog import CSVImportPlusDialog
 
 
 def is_valid_csv_text(text: str) -> bool:
-    text = text.strip()
-    if not text:
-        return False
-    if text.startswith("#notetype:"):
+    # Only a bounded prefix is inspected, with all delimiters in one pass.
+    if text[:detector.VALIDATION_PREFIX_CHARS].lstrip().startswith("#notetype:"):
         return True
-    lines = [line for line in text.splitlines() if line.strip()]
-    if not lines:
-        return False
-    
-    # Try delimiters
-    for delim in (',', '\t', ';', '|'):
-        try:
-            reader = csv.reader(io.StringIO(text), delimiter=delim)
-            rows = [r for r in reader if r]
-            if rows and any(len(r) > 1 for r in rows):
-                return True
-        except Exception:
-            continue
-    return False
+    return detector.has_multi_column_row(text)
 
 
 class OverviewDragDropFilter(QObject):
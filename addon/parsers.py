@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import importlib.util
+import io
+
+# CSV row parsers. Every backend takes an iterable of "\n"-terminated lines
+# (see detector.iter_lines) and yields rows as lists of strings with the
+# stdlib csv dialect: '"' quoting with doubled quotes, no escape character,
+# quoted values may span lines, rows may have different lengths and a blank
+# line gives an empty row. count_rows() may also be given the original text,
+# which lets a backend skip the line splitting.
+
+BACKEND_AUTO = "auto"
+
+# pyarrow is not bundled with Anki and is slow to import, so it is only
+# imported the first time a count needs it.
+_pyarrow = {}
+
+
+def _pyarrow_available():
+    if "available" not in _pyarrow:
+        try:
+            _pyarrow["available"] = importlib.util.find_spec("pyarrow") is not None
+        except Exception:
+            _pyarrow["available"] = False
+    return _pyarrow["available"]
+
+
+def _load_pyarrow():
+    # (pyarrow, pyarrow.csv), or (None, None) if the import fails.
+    if "modules" not in _pyarrow:
+        try:
+            import pyarrow
+            import pyarrow.csv as pyarrow_csv
+
+            _pyarrow["modules"] = (pyarrow, pyarrow_csv)
+        except Exception:  # pragma: no cover - not bundled with Anki
+            _pyarrow["modules"] = (None, None)
+    return _pyarrow["modules"]
+
+
+class StdlibParser:
+    name = "stdlib"
+    label = "Python csv module"
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def iter_rows(self, lines, delimiter):
+        return csv.reader(lines, delimiter=delimiter)
+
+    def count_rows(self, lines, delimiter, text=None):
+        return sum(1 for _ in csv.reader(lines, delimiter=delimiter))
+
+
+class PyArrowParser:
+    # Counts rows with pyarrow's multithreaded C++ reader, which parses the
+    # whole input at once. Rows are still built by the stdlib reader: turning
+    # Arrow columns back into Python lists is slower than csv.reader and
+    # would hold the whole input in memory.
+    name = "pyarrow"
+    label = "pyarrow for row counts (if installed)"
+
+    @staticmethod
+    def available() -> bool:
+        return _pyarrow_available()
+
+    def iter_rows(self, lines, delimiter):
+        return csv.reader(lines, delimiter=delimiter)
+
+    def count_rows(self, lines, delimiter, text=None):
+        # Blank lines count as rows either way, so padding does not matter.
+        if text is None:
+            text = "".join(lines)
+            lines = io.StringIO(text)
+        try:
+            table = self._read(text, delimiter)
+        except Exception:
+            table = None
+        if table is None:
+            return sum(1 for _ in csv.reader(lines, delimiter=delimiter))
+        return table.num_rows
+
+    @staticmethod
+    def _read(text, delimiter):
+        pyarrow, pyarrow_csv = _load_pyarrow()
+        if pyarrow_csv is None:
+            return None
+        first_line = text[:text.find("\n") + 1] or text
+        first = next(csv.reader([first_line], delimiter=delimiter), None)
+        if not first:
+            return None
+        names = [f"c{i}" for i in range(len(first))]
+        return pyarrow_csv.read_csv(
+            pyarrow.py_buffer(text.encode("utf-8")),
+            read_options=pyarrow_csv.ReadOptions(column_names=names),
+            parse_options=pyarrow_csv.ParseOptions(
+                delimiter=delimiter,
+                quote_char='"',
+                double_quote=True,
+                escape_char=False,
+                newlines_in_values=True,
+                ignore_empty_lines=False,
+            ),
+            convert_options=pyarrow_csv.ConvertOptions(
+                column_types={name: pyarrow.string() for name in names},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+
+
+class AutoParser:
+    # Picks per operation. Rows are always built by the stdlib reader.
+    # Counting text already in memory never leaves Arrow, so it uses pyarrow
+    # when installed; streamed input stays on the stdlib reader.
+    name = BACKEND_AUTO
+
+    def __init__(self):
+        self._stdlib = StdlibParser()
+        self._counter = PyArrowParser() if PyArrowParser.available() else self._stdlib
+
+    def iter_rows(self, lines, delimiter):
+        return self._stdlib.iter_rows(lines, delimiter)
+
+    def count_rows(self, lines, delimiter, text=None):
+        if text is None:
+            return self._stdlib.count_rows(lines, delimiter)
+        return self._counter.count_rows(lines, delimiter, text)
+
+
+BACKENDS = (StdlibParser, PyArrowParser)
+
+_selected = {"name": BACKEND_AUTO}
+
+
+def available_backends():
+    return [backend for backend in BACKENDS if backend.available()]
+
+
+def set_backend(name):
+    # "auto" picks the faster installed backend per operation; an unknown or
+    # unavailable name falls back to the stdlib parser.
+    _selected["name"] = name or BACKEND_AUTO
+
+
+def get_parser():
+    name = _selected["name"]
+    if name == BACKEND_AUTO:
+        return AutoParser()
+    for backend in BACKENDS:
+        if backend.name == name and backend.available():
+            return backend()
+    return StdlibParser()
+
+
+def iter_rows(lines, delimiter):
+    return get_parser().iter_rows(lines, delimiter)
+
+
+def count_rows(lines, delimiter, text=None):
+    return get_parser().count_rows(lines, delimiter, text)
@@ -8,8 +8,11 @@ from aqt.qt import (
     QLabel,
     QFormLayout,
     QCheckBox,
+    QComboBox,
 )
 
+from .. import parsers
+
 CONFIG_KEY_CONFIRM_CLIPBOARD_QUICK_IMPORT = "confirm_clipboard_quick_import"
 CONFIG_KEY_ALLOW_ANY_CLIPBOARD_QUICK_IMPORT = "allow_any_clipboard_quick_import"
 
@@ -90,6 +93,42 @@ class AdvancedTab(QWidget):
         )
         form.addRow("", self.disable_delimiter_auto_detect_check)
 
+        self.sql_duplicate_lookup_check = QCheckBox(
+            "Match existing notes in the database", self
+        )
+        self.sql_duplicate_lookup_check.setToolTip(
+            "For Update/Preserve imports, look up only the imported first fields in Anki's database "
+            "instead of loading every note of the note type. Faster for small imports into large collections."
+        )
+        self.sql_duplicate_lookup_check.toggled.connect(
+            lambda _: self.dialog.save_config() if hasattr(self.dialog, "save_config") else None
+        )
+        form.addRow("", self.sql_duplicate_lookup_check)
+
+        self.batch_tag_check = QCheckBox("Tag each import with a batch tag", self)
+        self.batch_tag_check.setToolTip(
+            "Adds a tag such as CSVImportPlus::2026-01-31-120000-1a2b3c to every imported or updated note, "
+            "so \"Browse Selected\" in History can find a whole batch with one tag search."
+        )
+        self.batch_tag_check.toggled.connect(
+            lambda _: self.dialog.save_config() if hasattr(self.dialog, "save_config") else None
+        )
+        form.addRow("", self.batch_tag_check)
+
+        self.csv_parser_combo = QComboBox(self)
+        self.csv_parser_combo.addItem("Automatic", parsers.BACKEND_AUTO)
+        for backend in parsers.BACKENDS:
+            label = backend.label
+            if not backend.available():
+                label += " – not installed"
+            self.csv_parser_combo.addItem(label, backend.name)
+        self.csv_parser_combo.setToolTip(
+            "Parser used to count CSV rows. Rows are always read with Python's csv module; "
+            "pyarrow only speeds up row counts of large content. Automatic uses pyarrow when installed."
+        )
+        self.csv_parser_combo.currentIndexChanged.connect(self.on_csv_parser_changed)
+        form.addRow("CSV parser:", self.csv_parser_combo)
+
         layout.addStretch()
 
     def load_config(self, config):
@@ -129,6 +168,23 @@ class AdvancedTab(QWidget):
         )
         self.disable_delimiter_auto_detect_check.blockSignals(False)
 
+        self.sql_duplicate_lookup_check.blockSignals(True)
+        self.sql_duplicate_lookup_check.setChecked(
+            config.get("sql_duplicate_lookup", False)
+        )
+        self.sql_duplicate_lookup_check.blockSignals(False)
+
+        self.batch_tag_check.blockSignals(True)
+        self.batch_tag_check.setChecked(config.get("batch_tag", True))
+        self.batch_tag_check.blockSignals(False)
+
+        backend = config.get("csv_parser", parsers.BACKEND_AUTO)
+        idx = self.csv_parser_combo.findData(backend)
+        self.csv_parser_combo.blockSignals(True)
+        self.csv_parser_combo.setCurrentIndex(idx if idx >= 0 else 0)
+        self.csv_parser_combo.blockSignals(False)
+        parsers.set_backend(self.csv_parser_combo.currentData())
+
     def save_config(self, config):
         config["deck_lock"] = self.deck_lock_check.isChecked()
         config["first_row_header"] = self.header_check.isChecked()
@@ -137,6 +193,14 @@ class AdvancedTab(QWidget):
         config[CONFIG_KEY_CONFIRM_CLIPBOARD_QUICK_IMPORT] = self.clipboard_confirm_toggle.isChecked()
         config["disable_notetype_auto_detect"] = self.disable_notetype_auto_detect_check.isChecked()
         config["disable_delimiter_auto_detect"] = self.disable_delimiter_auto_detect_check.isChecked()
+        config["sql_duplicate_lookup"] = self.sql_duplicate_lookup_check.isChecked()
+        config["batch_tag"] = self.batch_tag_check.isChecked()
+        config["csv_parser"] = self.csv_parser_combo.currentData()
+
+    def on_csv_parser_changed(self, _idx):
+        parsers.set_backend(self.csv_parser_combo.currentData())
+        if hasattr(self.dialog, "save_config"):
+            self.dialog.save_config()
 
     def on_deck_lock_toggled(self, checked):
         if hasattr(self.dialog, "on_deck_lock_toggled"):
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from aqt.qt import (
+    QAbstractItemView,
+    QAbstractTableModel,
+    QApplication,
+    QComboBox,
+    QModelIndex,
+    QSize,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionComboBox,
+    QTableView,
+    QTimer,
+    Qt,
+)
+
+# Table model over the dialog's bulk_file_details list: one row per queued
+# file, read straight from its details dict. Combo cells are painted, and a
+# real QComboBox exists only while one cell is being edited (ComboDelegate);
+# the remove button is painted by delegates.ActionDelegate. Reordering and
+# removing a file move or remove one model row instead of rebuilding widgets.
+COL_NAME, COL_DELIMITER, COL_NOTE_TYPE, COL_ROWS, COL_STATUS, COL_ACTIONS = range(6)
+HEADERS = ("File Name", "Delimiter", "Note Type", "Rows", "Status", "Actions")
+
+# Combo index -> delimiter; index 0 is auto-detect.
+DELIMITER_CHOICES = ("Auto-detect", "Comma (,)", "Tab", "Semicolon (;)", "Pipe (|)")
+
+
+class BulkFilesModel(QAbstractTableModel):
+    def __init__(self, on_delimiter_changed, on_model_changed, parent=None):
+        super().__init__(parent)
+        self._details = []
+        # Note type names; combo index 0 is "None".
+        self._note_types = ["None"]
+        self._on_delimiter_changed = on_delimiter_changed
+        self._on_model_changed = on_model_changed
+
+    def set_files(self, details, note_type_names):
+        # details is kept by reference; row moves and removals go through
+        # move_row()/remove_row() so the views hear about them.
+        self.beginResetModel()
+        self._details = details
+        self._note_types = ["None"] + list(note_type_names)
+        self.endResetModel()
+
+    def choices(self, column):
+        if column == COL_DELIMITER:
+            return DELIMITER_CHOICES
+        if column == COL_NOTE_TYPE:
+            return self._note_types
+        return ()
+
+    def row_of(self, details):
+        for row, d in enumerate(self._details):
+            if d is details:
+                return row
+        return -1
+
+    def refresh_row(self, row):
+        if 0 <= row < len(self._details):
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+
+    def move_row(self, src_row, dest_row):
+        count = len(self._details)
+        if src_row == dest_row or not (0 <= src_row < count and 0 <= dest_row < count):
+            return False
+        # beginMoveRows takes the row the item is inserted before.
+        before = dest_row + 1 if dest_row > src_row else dest_row
+        self.beginMoveRows(QModelIndex(), src_row, src_row, QModelIndex(), before)
+        self._details.insert(dest_row, self._details.pop(src_row))
+        self.endMoveRows()
+        return True
+
+    def remove_row(self, row):
+        if not 0 <= row < len(self._details):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._details[row]
+        self.endRemoveRows()
+        return True
+
+    # ---- QAbstractTableModel ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._details)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            # Dropping below the last row moves a file to the end.
+            return Qt.ItemFlag.ItemIsDropEnabled
+        flags = (
+            Qt.ItemFlag.ItemIsEnabled
+            | Qt.ItemFlag.ItemIsSelectable
+            | Qt.ItemFlag.ItemIsDragEnabled
+            | Qt.ItemFlag.ItemIsDropEnabled
+        )
+        if index.column() in (COL_DELIMITER, COL_NOTE_TYPE):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def _combo_index(self, details, column):
+        if column == COL_DELIMITER:
+            return details.get("selected_delim_idx", 0)
+        model_idx = details.get("model_idx")
+        return 0 if model_idx is None else model_idx + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._details):
+            return None
+        details = self._details[index.row()]
+        column = index.column()
+        analyzing = details.get("analyzing", False)
+
+        if role == Qt.ItemDataRole.EditRole and column in (COL_DELIMITER, COL_NOTE_TYPE):
+            return self._combo_index(details, column)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            if column == COL_NAME:
+                return details["path"]
+            if column == COL_ACTIONS:
+                return "Remove file"
+            return None
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if column == COL_NAME:
+            return os.path.basename(details["path"])
+        if column in (COL_DELIMITER, COL_NOTE_TYPE):
+            labels = self.choices(column)
+            combo_idx = self._combo_index(details, column)
+            return labels[combo_idx] if 0 <= combo_idx < len(labels) else labels[0]
+        if column == COL_ROWS:
+            return "…" if analyzing else str(details.get("rows_count", 0))
+        if column == COL_STATUS:
+            return details.get("status") or ("Analyzing…" if analyzing else "Ready")
+        if column == COL_ACTIONS:
+            return "✖"
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row = index.row()
+        details = self._details[row]
+        if value == self._combo_index(details, index.column()):
+            return False
+        if index.column() == COL_DELIMITER:
+            self._on_delimiter_changed(row, value)
+        elif index.column() == COL_NOTE_TYPE:
+            self._on_model_changed(row, value)
+        else:
+            return False
+        self.refresh_row(row)
+        return True
+
+
+class ComboDelegate(QStyledItemDelegate):
+    # Paints a combo box in the cell and opens a real one only for editing,
+    # with the choices given by model.choices(column).
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, option.widget)
+        combo = QStyleOptionComboBox()
+        combo.rect = option.rect.adjusted(2, 1, -2, -1)
+        combo.currentText = index.data(Qt.ItemDataRole.DisplayRole) or ""
+        combo.state = QStyle.StateFlag.State_Enabled
+        combo.palette = option.palette
+        combo.fontMetrics = option.fontMetrics
+        style.drawComplexControl(QStyle.ComplexControl.CC_ComboBox, combo, painter, option.widget)
+        style.drawControl(QStyle.ControlElement.CE_ComboBoxLabel, combo, painter, option.widget)
+
+    def sizeHint(self, option, index):
+        # Room for the drop-down arrow.
+        hint = super().sizeHint(option, index)
+        return QSize(hint.width() + 30, hint.height())
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(list(index.model().choices(index.column())))
+        # Commit as soon as a choice is picked, like the old per-row combos.
+        editor.activated.connect(lambda _idx, e=editor: self._commit(e))
+        QTimer.singleShot(0, editor.showPopup)
+        return editor
+
+    def _commit(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentIndex(index.data(Qt.ItemDataRole.EditRole) or 0)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentIndex(), Qt.ItemDataRole.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
+
+
+class BulkFilesView(QTableView):
+    # Rows are reordered by dragging; the drop is handed to
+    # dialog.move_bulk_file_to(), which moves the model row.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setDragEnabled(True)
+        self.setAcceptDrops(True)
+        self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.setDragDropOverwriteMode(False)
+        self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        # No CurrentChanged: arrowing through the table must not open the
+        # combo cells' drop-downs.
+        self.setEditTriggers(
+            QAbstractItemView.EditTrigger.SelectedClicked
+            | QAbstractItemView.EditTrigger.DoubleClicked
+            | QAbstractItemView.EditTrigger.EditKeyPressed
+        )
+        self.dialog = None
+
+    def dropEvent(self, event):
+        if event.source() is not self:
+            super().dropEvent(event)
+            return
+        selected_rows = self.selectionModel().selectedRows()
+        if not selected_rows:
+            return
+        src_row = selected_rows[0].row()
+
+        pos = event.position().toPoint() if hasattr(event, "position") else event.pos()
+        target = self.indexAt(pos)
+        dest_row = target.row() if target.isValid() else self.model().rowCount() - 1
+
+        if self.dialog and hasattr(self.dialog, "move_bulk_file_to"):
+            self.dialog.move_bulk_file_to(src_row, dest_row)
+            event.accept()
+        else:
+            super().dropEvent(event)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from aqt.qt import (
+    QApplication,
+    QColor,
+    QEvent,
+    QPalette,
+    QPersistentModelIndex,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
+    QTimer,
+    Qt,
+)
+
+# Item delegates shared by the tabs' model-backed views.
+
+
+class ActionDelegate(QStyledItemDelegate):
+    # Paints the cell text as a red push button and calls on_click() with a
+    # QPersistentModelIndex when it is clicked, instead of a QPushButton
+    # widget per row.
+    def __init__(self, on_click, parent=None):
+        super().__init__(parent)
+        self._on_click = on_click
+
+    def paint(self, painter, option, index):
+        text = index.data(Qt.ItemDataRole.DisplayRole)
+        if not text:
+            super().paint(painter, option, index)
+            return
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 1, -2, -1)
+        button.text = text
+        button.state = QStyle.StateFlag.State_Enabled
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            button.state |= QStyle.StateFlag.State_MouseOver
+        button.palette = QPalette(option.palette)
+        button.palette.setColor(QPalette.ColorRole.ButtonText, QColor("#d32f2f"))
+        button.fontMetrics = option.fontMetrics
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        painter.save()
+        if not index.parent().isValid():
+            font = painter.font()
+            font.setBold(True)
+            painter.setFont(font)
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (
+            event.type() == QEvent.Type.MouseButtonRelease
+            and event.button() == Qt.MouseButton.LeftButton
+            and index.data(Qt.ItemDataRole.DisplayRole)
+        ):
+            pos = event.position().toPoint() if hasattr(event, "position") else event.pos()
+            if option.rect.contains(pos):
+                # Run after the event returns; the click may remove this row.
+                persistent = QPersistentModelIndex(index)
+                QTimer.singleShot(0, lambda: self._on_click(persistent))
+                return True
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+from aqt.qt import (
+    QAbstractItemModel,
+    QModelIndex,
+    Qt,
+)
+
+from .. import history_store
+
+# Tree model over history_store: one top-level row per batch (newest first)
+# with one child row per note. Children are fetched in chunks when a batch is
+# expanded or scrolled, so a batch of 50k notes costs nothing until opened;
+# previews the batch did not keep are read from the collection per chunk.
+# Column 1 holds the delete action, painted by delegates.ActionDelegate.
+FETCH_CHUNK = 200
+
+BATCH_ID_ROLE = Qt.ItemDataRole.UserRole
+NID_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+class _Node:
+    # internalPointer() of an index: the batch its row belongs to. Kept alive
+    # by the model; a batch keeps its node while its row moves.
+    __slots__ = ("batch_id",)
+
+    def __init__(self, batch_id):
+        self.batch_id = batch_id
+
+
+class HistoryModel(QAbstractItemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Batch ids in display order, as last announced to the views.
+        self._rows = []
+        self._batches = {}
+        self._root = _Node(None)
+        self._nodes = {}
+        self._fetched = {}
+        self._counts = {}
+        # Previews read from the collection for fetched rows.
+        self._previews = {}
+
+    def _node(self, batch_id):
+        node = self._nodes.get(batch_id)
+        if node is None:
+            node = self._nodes[batch_id] = _Node(batch_id)
+        return node
+
+    def _is_batch_row(self, index):
+        return index.internalPointer() is self._root
+
+    def batch_id(self, index):
+        if not index.isValid():
+            return None
+        if self._is_batch_row(index):
+            return self._rows[index.row()]
+        return index.internalPointer().batch_id
+
+    def card_index(self, index):
+        # Position of a note row within its batch, None for batch rows.
+        if not index.isValid() or self._is_batch_row(index):
+            return None
+        return index.row()
+
+    def batch_index(self, batch_id, column=0):
+        try:
+            return self.index(self._rows.index(batch_id), column)
+        except ValueError:
+            return QModelIndex()
+
+    # ---- QAbstractItemModel ----
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, self._root)
+        return self.createIndex(row, column, self._node(self._rows[parent.row()]))
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid() or self._is_batch_row(index):
+            return QModelIndex()
+        return self.batch_index(index.internalPointer().batch_id)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._rows)
+        if not self._is_batch_row(parent) or parent.column() != 0:
+            return 0
+        return self._fetched.get(self._rows[parent.row()], 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 2
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._rows)
+        if not self._is_batch_row(parent) or parent.column() != 0:
+            return False
+        return self._counts.get(self._rows[parent.row()], 0) > 0
+
+    def canFetchMore(self, parent):
+        if not parent.isValid() or not self._is_batch_row(parent):
+            return False
+        batch_id = self._rows[parent.row()]
+        return self._fetched.get(batch_id, 0) < self._counts.get(batch_id, 0)
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        batch_id = self._rows[parent.row()]
+        start = self._fetched.get(batch_id, 0)
+        end = min(self._counts[batch_id], start + FETCH_CHUNK)
+        self._load_previews(self._batches[batch_id], start, end)
+        self.beginInsertRows(parent, start, end - 1)
+        self._fetched[batch_id] = end
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return ("History", "Action")[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        batch_id = self.batch_id(index)
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+        if role == BATCH_ID_ROLE:
+            return batch_id
+        card_idx = self.card_index(index)
+
+        if card_idx is None:
+            if role == Qt.ItemDataRole.DisplayRole:
+                if index.column() == 1:
+                    return "Delete Batch"
+                notetype_name = batch.get("notetype_name", "Unknown")
+                return (
+                    f"[{batch['time']}] Added {batch['added']} cards to "
+                    f"'{batch['deck_name']}' ({notetype_name})"
+                )
+            return None
+
+        if card_idx >= len(batch["nids"]):
+            return None
+        nid = batch["nids"][card_idx]
+        if role == NID_ROLE:
+            return nid
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == 1:
+                return "Delete"
+            preview_text = batch["previews"].get(nid)
+            if preview_text is None:
+                preview_text = self._previews.get(nid, "(note no longer exists)")
+            return history_store.format_preview(preview_text)
+        return None
+
+    def _load_previews(self, batch, start, end):
+        previews = batch["previews"]
+        missing = [
+            nid for nid in batch["nids"][start:end]
+            if nid not in previews and nid not in self._previews
+        ]
+        if missing:
+            self._previews.update(history_store.fetch_previews(missing))
+
+    # ---- updates ----
+    def sync(self, changed=None):
+        # Bring the rows in line with the store: removed batches are taken
+        # out, new batches are inserted at the top and batches that lost
+        # notes have their fetched children reloaded. Nothing else is touched.
+        # changed, when known, limits the last step to those batch ids.
+        batches = history_store.get_store().batches()
+        live = self._batches = {batch["id"]: batch for batch in batches}
+
+        for row in range(len(self._rows) - 1, -1, -1):
+            batch_id = self._rows[row]
+            if batch_id not in live:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self._forget(batch_id)
+                self.endRemoveRows()
+
+        known = set(self._rows)
+        new_ids = [b["id"] for b in reversed(batches) if b["id"] not in known]
+        if new_ids:
+            self.beginInsertRows(QModelIndex(), 0, len(new_ids) - 1)
+            self._rows[0:0] = new_ids
+            for batch_id in new_ids:
+                self._counts[batch_id] = len(live[batch_id]["nids"])
+            self.endInsertRows()
+
+        for batch_id in self._rows if changed is None else changed:
+            if batch_id not in live:
+                continue
+            count = len(live[batch_id]["nids"])
+            if count != self._counts.get(batch_id):
+                self._reload_children(batch_id, count)
+        return new_ids
+
+    def _reload_children(self, batch_id, count):
+        parent = self.batch_index(batch_id)
+        fetched = self._fetched.get(batch_id, 0)
+        if fetched:
+            self.beginRemoveRows(parent, 0, fetched - 1)
+            self._fetched[batch_id] = 0
+            self.endRemoveRows()
+        self._counts[batch_id] = count
+        if fetched and count:
+            self._load_previews(self._batches[batch_id], 0, min(fetched, count))
+            self.beginInsertRows(parent, 0, min(fetched, count) - 1)
+            self._fetched[batch_id] = min(fetched, count)
+            self.endInsertRows()
+        self.dataChanged.emit(parent, self.batch_index(batch_id, 1))
+
+    def _forget(self, batch_id):
+        self._fetched.pop(batch_id, None)
+        self._counts.pop(batch_id, None)
+        # The node stays: Qt may still hold indexes pointing at it.
@@ -19,45 +19,19 @@ from aqt.qt import (
     QWidget,
     Qt,
     QStackedWidget,
-    QTableWidget,
     QHeaderView,
     QProgressBar,
 )
 
-class ReorderableTableWidget(QTableWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setDragEnabled(True)
-        self.setAcceptDrops(True)
-        self.setDefaultDropAction(Qt.DropAction.MoveAction)
-        self.setDragDropOverwriteMode(False)
-        self.setDragDropMode(QTableWidget.DragDropMode.InternalMove)
-        self.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.dialog = None
-
-    def dropEvent(self, event):
-        if event.source() == self:
-            selected_rows = self.selectedItems()
-            if not selected_rows:
-                return
-            src_row = selected_rows[0].row()
-            
-            pos = event.position().toPoint() if hasattr(event, "position") else event.pos()
-            target_item = self.itemAt(pos)
-            if target_item:
-                dest_row = target_item.row()
-            else:
-                dest_row = self.rowCount() - 1
-                
-            if self.dialog and hasattr(self.dialog, "move_bulk_file_to"):
-                self.dialog.move_bulk_file_to(src_row, dest_row)
-                event.accept()
-            else:
-                super().dropEvent(event)
-        else:
-            super().dropEvent(event)
-
+from .bulk_model import (
+    COL_ACTIONS,
+    COL_DELIMITER,
+    COL_NOTE_TYPE,
+    BulkFilesModel,
+    BulkFilesView,
+    ComboDelegate,
+)
+from .delegates import ActionDelegate
 
 class ImportTab(QWidget):
     def __init__(self, parent=None):
@@ -150,12 +124,18 @@ class ImportTab(QWidget):
         self.csv_text.textChanged.connect(self.on_csv_text_changed)
         self.content_stack.addWidget(self.csv_text)
         
-        self.bulk_table = ReorderableTableWidget()
+        # One model row per queued file; see bulk_model.
+        self.bulk_model = BulkFilesModel(self.on_bulk_delimiter_changed, self.on_bulk_model_changed, self)
+        self.bulk_table = BulkFilesView()
         self.bulk_table.dialog = self.dialog
-        self.bulk_table.setColumnCount(6)
-        self.bulk_table.setHorizontalHeaderLabels([
-            "File Name", "Delimiter", "Note Type", "Rows", "Status", "Actions"
-        ])
+        self.bulk_table.setModel(self.bulk_model)
+        self.bulk_combo_delegate = ComboDelegate(self.bulk_table)
+        self.bulk_table.setItemDelegateForColumn(COL_DELIMITER, self.bulk_combo_delegate)
+        self.bulk_table.setItemDelegateForColumn(COL_NOTE_TYPE, self.bulk_combo_delegate)
+        self.bulk_remove_delegate = ActionDelegate(self.on_bulk_remove_clicked, self.bulk_table)
+        self.bulk_table.setItemDelegateForColumn(COL_ACTIONS, self.bulk_remove_delegate)
+        self.bulk_table.setMouseTracking(True)
+        self.bulk_table.verticalHeader().setDefaultSectionSize(28)
         self.bulk_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         self.bulk_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
         self.bulk_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
@@ -163,15 +143,27 @@ class ImportTab(QWidget):
         self.bulk_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
         self.bulk_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeMode.ResizeToContents)
         self.bulk_table.setAlternatingRowColors(True)
-        self.bulk_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
         self.content_stack.addWidget(self.bulk_table)
         
         layout.addWidget(self.content_stack, 1)
 
         # Progress bar
+        progress_row_w = QWidget()
+        progress_row = QHBoxLayout(progress_row_w)
+        progress_row.setContentsMargins(0, 0, 0, 0)
+
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
-        layout.addWidget(self.progress_bar)
+        progress_row.addWidget(self.progress_bar, 1)
+
+        self.cancel_import_btn = QPushButton("Cancel Import")
+        self.cancel_import_btn.setToolTip(
+            "Stop the running import. Notes already written by the current file are rolled back."
+        )
+        self.cancel_import_btn.setVisible(False)
+        self.cancel_import_btn.clicked.connect(self.on_cancel_import)
+        progress_row.addWidget(self.cancel_import_btn, 0)
+        layout.addWidget(progress_row_w)
 
         # Status
         self.status_label = QLabel("")
@@ -389,6 +381,18 @@ class ImportTab(QWidget):
         if hasattr(self.dialog, "create_subdeck"):
             self.dialog.create_subdeck()
 
+    def on_bulk_delimiter_changed(self, row_idx, combo_idx):
+        if hasattr(self.dialog, "on_row_delimiter_changed"):
+            self.dialog.on_row_delimiter_changed(row_idx, combo_idx)
+
+    def on_bulk_model_changed(self, row_idx, combo_idx):
+        if hasattr(self.dialog, "on_row_model_changed"):
+            self.dialog.on_row_model_changed(row_idx, combo_idx)
+
+    def on_bulk_remove_clicked(self, index):
+        if index.isValid() and hasattr(self.dialog, "remove_bulk_file"):
+            self.dialog.remove_bulk_file(index.row())
+
     def on_delimiter_changed(self, index):
         if hasattr(self.dialog, "on_content_changed"):
             self.dialog.on_content_changed()
@@ -397,6 +401,10 @@ class ImportTab(QWidget):
         if hasattr(self.dialog, "do_import"):
             self.dialog.do_import()
 
+    def on_cancel_import(self):
+        if hasattr(self.dialog, "cancel_import"):
+            self.dialog.cancel_import()
+
     def on_open_with_anki(self):
         if hasattr(self.dialog, "open_with_default_importer"):
             self.dialog.open_with_default_importer()
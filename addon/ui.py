@@ -44,6 +44,7 @@ def setup_ui(self):
     self.quick_clipboard_btn = self.import_tab_widget.quick_clipboard_btn
     self.remove_btn = self.import_tab_widget.remove_btn
     self.progress_bar = self.import_tab_widget.progress_bar
+    self.cancel_import_btn = self.import_tab_widget.cancel_import_btn
     self.field_mapping_group = self.import_tab_widget.field_mapping_group
     self.field_mapping_layout = self.import_tab_widget.field_mapping_layout
     
@@ -64,5 +65,7 @@ def setup_ui(self):
     self.clipboard_confirm_toggle = self.advanced_tab_widget.clipboard_confirm_toggle
     self.disable_notetype_auto_detect_check = self.advanced_tab_widget.disable_notetype_auto_detect_check
     self.disable_delimiter_auto_detect_check = self.advanced_tab_widget.disable_delimiter_auto_detect_check
+    self.sql_duplicate_lookup_check = self.advanced_tab_widget.sql_duplicate_lookup_check
+    self.batch_tag_check = self.advanced_tab_widget.batch_tag_check
 
     self.supporter_check = self.support_tab_widget.supporter_check
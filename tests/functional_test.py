@@ -61,6 +61,7 @@ class TestImporterFunctional(unittest.TestCase):
         import addon.importer as importer_mod
         import addon.tabs.import_tab as import_tab_mod
         import addon.tabs.history_tab as history_tab_mod
+        import addon.history_store as history_store_mod
         import addon.tabs.advanced_tab as advanced_tab_mod
         import addon.tabs.support_tab as support_tab_mod
         import addon.main as main_mod
@@ -71,6 +72,7 @@ class TestImporterFunctional(unittest.TestCase):
         importer_mod.mw = aqt.mw
         import_tab_mod.mw = aqt.mw
         history_tab_mod.mw = aqt.mw
+        history_store_mod.mw = aqt.mw
         advanced_tab_mod.mw = aqt.mw
         support_tab_mod.mw = aqt.mw
         main_mod.mw = aqt.mw
@@ -297,6 +299,50 @@ class TestImporterFunctional(unittest.TestCase):
         
         dialog.accept()
 
+    def test_saved_history_removed_from_config(self):
+        # History kept in the config by older versions is moved to
+        # user_files/ and must not be written back by the dialog.
+        import copy
+        import aqt
+        stored = {
+            "remember_history": True,
+            "saved_history": [{
+                "time": "2024-01-01 10:00:00",
+                "deck_name": "Default",
+                "expanded": False,
+                "added": 1,
+                "updated": 0,
+                "cards": [{"id": 1, "preview": "Front"}],
+            }],
+        }
+
+        def write_config(_name, config):
+            stored.clear()
+            stored.update(copy.deepcopy(config))
+
+        aqt.mw.addonManager = types.SimpleNamespace(
+            getConfig=lambda *args: copy.deepcopy(stored),
+            writeConfig=write_config,
+            addonFromModule=lambda *args: "csv_import_plus_dev",
+            addonsFolder=lambda *args: self.temp_dir,
+            addonMeta=lambda *args: {},
+        )
+        import addon.dialog as dialog_mod
+        import addon.history_store as history_store_mod
+        dialog_mod.mw = aqt.mw
+        history_store_mod.mw = aqt.mw
+        history_store_mod._state["store"] = None
+
+        from addon.dialog import CSVImportPlusDialog
+        dialog = CSVImportPlusDialog(None)
+        dialog.tag_all_edit.setText("changed")
+        dialog.accept()
+
+        self.assertNotIn("saved_history", stored)
+        self.assertEqual(stored.get("tag_all"), "changed")
+        self.assertEqual(len(history_store_mod.get_store().batches()), 1)
+        history_store_mod._state["store"] = None
+
     def test_disable_auto_detection(self):
         import aqt
         aqt.mw.addonManager = types.SimpleNamespace(
@@ -372,9 +418,9 @@ class TestImporterFunctional(unittest.TestCase):
         self.assertEqual(len(dialog.file_paths), 2)
         
         # Verify bulk table row count and items
-        self.assertEqual(dialog.import_tab_widget.bulk_table.rowCount(), 2)
-        self.assertEqual(dialog.import_tab_widget.bulk_table.item(0, 0).text(), "test1.csv")
-        self.assertEqual(dialog.import_tab_widget.bulk_table.item(1, 0).text(), "test2.csv")
+        self.assertEqual(dialog.import_tab_widget.bulk_model.rowCount(), 2)
+        self.assertEqual(dialog.import_tab_widget.bulk_model.index(0, 0).data(), "test1.csv")
+        self.assertEqual(dialog.import_tab_widget.bulk_model.index(1, 0).data(), "test2.csv")
 
         # Run bulk import
         dialog.do_import()
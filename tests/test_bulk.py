@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import threading
+import types
+import unittest
+
+sys.path.append(os.path.dirname(__file__))
+
+from _helpers import install_anki_stubs, load_addon_module
+
+install_anki_stubs()
+
+bulk = load_addon_module("bulk")
+
+
+class TestBulk(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(5):
+            path = os.path.join(self.tmpdir.name, f"deck{i}.csv")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write("#notetype:Basic\nFront;Back\n" + "q;a\n" * (i + 1))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        bulk.mw.taskman = None
+
+    def test_analyze_file_keeps_sample_and_counts_rows(self):
+        sample, source = bulk.analyze_file(self.paths[2])
+        self.assertTrue(sample.startswith("#notetype:Basic"))
+        self.assertEqual(source.delimiter, ";")
+        self.assertEqual(source.row_count, 4)
+        self.assertTrue(source.row_count_exact)
+
+    def test_analyze_files_inline_without_taskman(self):
+        bulk.mw.taskman = None
+        results = {}
+        done = []
+        bulk.analyze_files(
+            self.paths + [self.paths[0] + ".missing"],
+            lambda idx, future: results.setdefault(idx, future),
+            on_done=lambda: done.append(True),
+        )
+        self.assertEqual(done, [True])
+        self.assertEqual(results[4].result()[1].row_count, 6)
+        self.assertIsInstance(results[5].exception(), OSError)
+
+    def test_analyze_files_on_background_thread(self):
+        main_thread = threading.current_thread()
+        bulk.mw.taskman = types.SimpleNamespace(run_on_main=lambda func: func())
+
+        results = []
+        threads = set()
+        finished = threading.Event()
+
+        def on_result(idx, future):
+            threads.add(threading.current_thread())
+            results.append((idx, future.result()[1].row_count))
+
+        bulk.analyze_files(self.paths, on_result, on_done=finished.set)
+        self.assertTrue(finished.wait(5))
+        # Reported file by file, in order, from one worker.
+        self.assertEqual(results, [(i, i + 2) for i in range(5)])
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(main_thread, threads)
+
+    def _job(self, raw):
+        return {
+            "raw_content": raw,
+            "delimiter": ",",
+            "has_header": False,
+            "notetype": {"flds": [{"name": "Front"}, {"name": "Back"}]},
+            "field_mapping": None,
+            "allow_html": False,
+            "batch_size": 2,
+        }
+
+    def test_import_pipeline_prepares_files_ahead_of_writer(self):
+        jobs = [
+            self._job("a,1\nb,<2>\n\nc,3 t1\n"),
+            self._job(""),
+            self._job("x,y,tag\n" * 20),
+            self._job("z,9\n"),
+        ]
+        pipeline = bulk.ImportPipeline(jobs)
+        try:
+            first = list(pipeline.batches(0))
+            with self.assertRaises(bulk.importer.ImportFailed):
+                list(pipeline.batches(1))
+            # Abandon the third file after one batch; the last one still runs.
+            third = pipeline.batches(2)
+            next(third)
+            third.close()
+            last = list(pipeline.batches(3))
+        finally:
+            pipeline.close()
+
+        self.assertEqual(
+            first,
+            [
+                [("a", [(0, "a"), (1, "1")], []), ("b", [(0, "b"), (1, "&lt;2&gt;")], [])],
+                [None, ("c", [(0, "c"), (1, "3 t1")], [])],
+            ],
+        )
+        self.assertEqual(last, [[("z", [(0, "z"), (1, "9")], [])]])
+
+
+if __name__ == "__main__":
+    unittest.main()
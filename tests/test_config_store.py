@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(__file__))
+
+from _helpers import install_anki_stubs, load_addon_module
+
+install_anki_stubs()
+
+config_store = load_addon_module("config_store")
+
+
+class FakeAddonManager:
+    def __init__(self, config=None):
+        self.config = config
+        self.reads = 0
+        self.writes = []
+
+    def getConfig(self, name):
+        self.reads += 1
+        return self.config
+
+    def writeConfig(self, name, config):
+        self.writes.append((name, dict(config)))
+
+
+class TestConfigStore(unittest.TestCase):
+    def test_reads_config_once(self):
+        manager = FakeAddonManager({"tag_all": "a"})
+        store = config_store.ConfigStore(manager, "addon")
+        self.assertEqual(store.get()["tag_all"], "a")
+        store.get()
+        self.assertEqual(manager.reads, 1)
+
+    def test_changes_are_coalesced_until_flush(self):
+        manager = FakeAddonManager(None)
+        store = config_store.ConfigStore(manager, "addon")
+        for text in ("t", "ta", "tag"):
+            store.update({"tag_all": text})
+        self.assertTrue(store.dirty)
+        self.assertEqual(manager.writes, [])
+
+        self.assertTrue(store.flush())
+        self.assertEqual(manager.writes, [("addon", {"tag_all": "tag"})])
+        self.assertFalse(store.dirty)
+        self.assertFalse(store.flush())
+        self.assertEqual(len(manager.writes), 1)
+
+    def test_mark_dirty_after_in_place_edit(self):
+        manager = FakeAddonManager({})
+        store = config_store.ConfigStore(manager, "addon")
+        store.get().setdefault("field_mappings", {})["Basic"] = {"Front": 0}
+        store.mark_dirty()
+        store.flush()
+        self.assertEqual(manager.writes[0][1]["field_mappings"], {"Basic": {"Front": 0}})
+
+
+if __name__ == "__main__":
+    unittest.main()
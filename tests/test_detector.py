@@ -1,5 +1,6 @@
 import os
 import sys
+import types
 import unittest
 
 sys.path.append(os.path.dirname(__file__))
@@ -11,6 +12,12 @@ install_anki_stubs()
 detector = load_addon_module("detector")
 
 
+def csv_has_header(text):
+    import csv
+
+    return csv.Sniffer().has_header(text)
+
+
 class TestDetector(unittest.TestCase):
     def test_extract_directives(self):
         content = """#notetype: Basic\n#foo: bar\n\nFront,Back\n1,2"""
@@ -42,6 +49,160 @@ class TestDetector(unittest.TestCase):
     def test_get_delimiter_name(self):
         self.assertEqual(detector.get_delimiter_name("|"), "Pipe (|)")
 
+    def test_analyze(self):
+        source = detector.analyze("Front,Back\n{{c1::a}},b\n\nc,d,e\n")
+        self.assertEqual(source.delimiter, ",")
+        self.assertEqual(source.row_count, 4)
+        self.assertEqual(source.table.row(0), ["Front", "Back"])
+        self.assertEqual(list(source.table.widths), [2, 2, 3])
+        self.assertTrue(source.has_cloze)
+
+    def test_analyze_cache_hits_for_unchanged_content(self):
+        detector.clear_cache()
+        first = detector.analyze("A;B\n1;2\n")
+        second = detector.analyze("A;B\n1;2\n", ";")
+        third = detector.analyze("A;B\n1;2\n", ",")
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(len(detector._ANALYSIS_CACHE), 2)
+
+    def test_analyze_cache_evicts_least_recently_used(self):
+        detector.clear_cache()
+        first = detector.analyze("A,B\n0,x\n", ",")
+        for i in range(1, detector.MAX_CACHED_ANALYSES + 1):
+            detector.analyze(f"A,B\n{i},x\n", ",")
+        self.assertEqual(len(detector._ANALYSIS_CACHE), detector.MAX_CACHED_ANALYSES)
+        self.assertIsNot(detector.analyze("A,B\n0,x\n", ","), first)
+
+    def test_analyze_estimates_rows_for_large_content(self):
+        content = "".join(f"front {i:06d},back {i:06d}\n" for i in range(150000))
+        self.assertGreater(len(content), detector.ESTIMATE_ROWS_ABOVE)
+        source = detector.analyze(content, ",")
+        self.assertFalse(source.row_count_exact)
+        self.assertAlmostEqual(source.row_count, 150000, delta=1500)
+        self.assertEqual(source.table.row(0), ["front 000000", "back 000000"])
+        self.assertTrue(detector.format_row_count(source).startswith("~"))
+
+        source.set_exact_row_count(detector.count_rows(content, ","))
+        self.assertEqual(detector.format_row_count(source), "150000")
+        self.assertEqual(detector.analyze(content, ",", exact=True).row_count, 150000)
+
+    def test_count_rows_stops_once_cancelled(self):
+        parsers = detector.parsers
+        content = "front,back\n" * 20000
+        parsers.set_backend("stdlib")
+        try:
+            checks = []
+            count = detector.count_rows(
+                content, ",", lambda: checks.append(1) or len(checks) > 1
+            )
+        finally:
+            parsers.set_backend(parsers.BACKEND_AUTO)
+        self.assertLess(count, 20000)
+        self.assertEqual(len(checks), 2)
+
+    def test_looks_like_csv(self):
+        self.assertTrue(detector.looks_like_csv("#notetype: Basic\nFront,Back\n1,2\n"))
+        self.assertTrue(detector.looks_like_csv("a;b\n", ";"))
+        self.assertFalse(detector.looks_like_csv("just some text\n"))
+        self.assertFalse(detector.looks_like_csv("#notetype: Basic\n  \n"))
+
+    def test_looks_like_csv_only_reads_prefix(self):
+        head = "front,back\n" * 10
+        # A broken quote past the prefix is never looked at.
+        text = head + '"' + "x" * 1000
+        self.assertTrue(detector.looks_like_csv(text, max_chars=len(head) + 5))
+        # The prefix is cut back to the last whole line.
+        self.assertFalse(detector.looks_like_csv("single\n" + "a,b" * 100, max_chars=20))
+
+    def test_has_multi_column_row_matches_csv_reader(self):
+        import csv
+
+        cases = [
+            "a,b\nc,d",
+            "single_column_no_delimiters",
+            "one\ntwo\tthree",
+            '"a,b"\n"c;d"',
+            '"a,b\nc"\n"d|e"',
+            '"a,b\nc",d',
+            'x"y,z',
+            '"a""b";c',
+            '"a"b|c',
+            '"unterminated,\nstill quoted',
+            ",,\n;",
+            '" ",""\n,a',
+            '"\n",x',
+        ]
+        for text in cases:
+            expected = any(
+                len(row) > 1 and any(cell.strip() for cell in row)
+                for delim in detector.CANDIDATE_DELIMITERS
+                for row in csv.reader(detector.iter_lines(text), delimiter=delim)
+            )
+            self.assertEqual(detector.has_multi_column_row(text), expected, text)
+
+    def test_blank_rows_are_not_csv(self):
+        # Text that is only delimiters has no cells to import.
+        self.assertFalse(detector.looks_like_csv(","))
+        self.assertFalse(detector.looks_like_csv(",,\n , \n"))
+        self.assertFalse(detector.looks_like_csv('"",""'))
+        self.assertTrue(detector.looks_like_csv(",,\n,a"))
+
+    def test_has_multi_column_row_single_delimiter(self):
+        self.assertFalse(detector.has_multi_column_row("a;b", (",",)))
+        self.assertTrue(detector.has_multi_column_row("a;b", (";",)))
+
+    def test_column_table(self):
+        table = detector.ColumnTable([["a", "bb"], ["c"], ["d", "", "f"]])
+        self.assertEqual((table.row_count, table.column_count), (3, 3))
+        self.assertEqual(table.buffer, "abbcdf")
+        self.assertEqual(table.row(0), ["a", "bb"])
+        self.assertEqual(table.row(2), ["d", "", "f"])
+        self.assertIsNone(table.cell(1, 1))
+        self.assertEqual(list(table.widths), [2, 1, 3])
+
+    def test_guess_header_matches_sniffer(self):
+        samples = [
+            "Word,Count\napple,1\npear,22\n",
+            "apple,1\npear,22\nplum,3\n",
+            "Front,Back\nabc,xyz\ndef,uvw\n",
+            "abc,xyz\ndef,uvw\n",
+        ]
+        for text in samples:
+            source = detector.analyze(text, ",")
+            self.assertEqual(
+                source.has_header_guess, csv_has_header(text), text
+            )
+
+    def test_suggest_mapping_from_header(self):
+        source = detector.analyze("Back,front,Tags\n1,2,x\n", ",")
+        self.assertEqual(
+            detector.suggest_mapping(source, ["Front", "Back", "Extra", "Tags"], True),
+            {"Front": 1, "Back": 0, "Tags": 2},
+        )
+        self.assertEqual(detector.suggest_mapping(source, ["Front"], False), {})
+
+    def test_pick_note_type_uses_parsed_source(self):
+        source = detector.analyze("a,b\nc,d\n", ",")
+        models = {
+            1: {"flds": [{"name": "Front"}, {"name": "Back"}]},
+            2: {"flds": [{"name": "A"}, {"name": "B"}, {"name": "C"}]},
+        }
+        model_infos = [
+            types.SimpleNamespace(id=1, name="Basic"),
+            types.SimpleNamespace(id=2, name="Three"),
+        ]
+        header_check = types.SimpleNamespace(isChecked=lambda: False)
+        old_col = detector.mw.col
+        detector.mw.col = types.SimpleNamespace(
+            models=types.SimpleNamespace(get=models.get)
+        )
+        try:
+            name, fields, idx = detector.pick_note_type(source, model_infos, header_check)
+        finally:
+            detector.mw.col = old_col
+        self.assertEqual((name, fields, idx), ("Basic", 2, 0))
+
 
 if __name__ == "__main__":
     unittest.main()
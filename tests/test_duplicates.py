@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import sys
+import types
+import unittest
+
+sys.path.append(os.path.dirname(__file__))
+
+from _helpers import install_anki_stubs, load_addon_module
+
+install_anki_stubs()
+
+duplicates = load_addon_module("duplicates")
+
+
+class _FakeDb:
+    def __init__(self, notes):
+        self.notes = notes
+        self.mod = 1
+        self.scans = 0
+
+    def all(self, sql, *args):
+        self.scans += 1
+        return [(nid, flds) for nid, flds in self.notes.items()]
+
+    def scalar(self, sql, *args):
+        return self.mod
+
+
+class TestDuplicates(unittest.TestCase):
+    def setUp(self):
+        duplicates.clear_cache()
+        self.db = _FakeDb({1: " Front1 \x1fBack1", 2: "Front2\x1fBack2"})
+        self.col = types.SimpleNamespace(db=self.db, path="/tmp/collection.anki2")
+
+    def test_index_is_cached_until_collection_changes(self):
+        index = duplicates.get_index(self.col, 10)
+        self.assertEqual(index.lookup("Front1"), 1)
+        self.assertIs(duplicates.get_index(self.col, 10), index)
+        self.assertEqual(self.db.scans, 1)
+
+        self.db.mod = 2
+        duplicates.get_index(self.col, 10)
+        self.assertEqual(self.db.scans, 2)
+
+    def test_record_added_keeps_index_current(self):
+        index = duplicates.get_index(self.col, 10)
+        other = duplicates.get_index(self.col, 11)
+        self.db.mod = 2
+        duplicates.record_added(self.col, 10, 5, [("Front3", 3)], 1)
+
+        self.assertIs(duplicates.get_index(self.col, 10), index)
+        self.assertIs(duplicates.get_index(self.col, 11), other)
+        self.assertEqual(index.lookup("Front3"), 3)
+        self.assertIsNone(other.lookup("Front3"))
+        self.assertEqual(self.db.scans, 2)
+
+    def test_record_added_drops_stale_index(self):
+        duplicates.get_index(self.col, 10)
+        self.db.mod = 3
+        duplicates.record_added(self.col, 10, 5, [("Front3", 3)], 2)
+        duplicates.get_index(self.col, 10)
+        self.assertEqual(self.db.scans, 2)
+
+    def test_recorded_notes_are_excluded_while_importing(self):
+        self.assertFalse(duplicates.has_cached_index(self.col, 10))
+        index = duplicates.get_index(self.col, 10)
+        self.assertTrue(duplicates.has_cached_index(self.col, 10))
+        excluded = {3}
+        index.prefetch(self.col, ["Front3"], exclude_nids=excluded)
+        duplicates.record_added(self.col, 10, 5, [("Front3", 3)], 1)
+        self.assertIsNone(index.lookup("Front3"))
+        self.assertEqual(index.lookup("Front2"), 2)
+        index.prefetch(self.col, ["Front3"])
+        self.assertEqual(index.lookup("Front3"), 3)
+
+
+class _SqliteDb:
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("create table notes (id integer, mid integer, csum integer, flds text)")
+        self.conn.execute("create table cards (nid integer, did integer)")
+        self.writes = []
+
+    def all(self, sql, *args):
+        return self.conn.execute(sql, args).fetchall()
+
+    def execute(self, sql, *args):
+        self.writes.append(sql)
+        self.conn.execute(sql, args)
+
+    def executemany(self, sql, rows):
+        self.writes.append(sql)
+        self.conn.executemany(sql, rows)
+
+
+class TestSqlDuplicateLookup(unittest.TestCase):
+    def setUp(self):
+        self.db = _SqliteDb()
+        notes = [
+            (1, 10, 5, "Apple\x1fA", 1),
+            (2, 10, 6, " Banana \x1fB", 2),
+            (3, 11, 5, "Apple\x1fother type", 1),
+            (4, 10, 5, "Grape\x1fsame checksum", 1),
+        ]
+        for nid, mid, csum, flds, did in notes:
+            self.db.conn.execute("insert into notes values (?, ?, ?, ?)", (nid, mid, csum, flds))
+            self.db.conn.execute("insert into cards values (?, ?)", (nid, did))
+        self.col = types.SimpleNamespace(db=self.db)
+        self._old_checksum = duplicates.field_checksum
+
+    def tearDown(self):
+        duplicates.field_checksum = self._old_checksum
+
+    def test_matches_first_field_without_checksum(self):
+        duplicates.field_checksum = None
+        lookup = duplicates.SqlDuplicateLookup(10)
+        lookup.prefetch(self.col, ["Apple", "Banana", "Cherry"])
+        self.assertEqual(lookup.lookup("Apple"), 1)
+        self.assertEqual(lookup.lookup("Banana"), 2)
+        self.assertIsNone(lookup.lookup("Cherry"))
+
+    def test_matches_by_checksum_and_verifies_field(self):
+        duplicates.field_checksum = lambda text: len(text)
+        lookup = duplicates.SqlDuplicateLookup(10)
+        lookup.prefetch(self.col, ["Apple"])
+        self.assertEqual(lookup.keys, {"Apple": 1})
+
+    def test_checksum_matches_fields_with_surrounding_whitespace(self):
+        duplicates.field_checksum = lambda text: len(text)
+        self.db.conn.execute("insert into notes values (5, 10, ?, ?)", (len(" Kiwi\t"), " Kiwi\t\x1fK"))
+        lookup = duplicates.SqlDuplicateLookup(10)
+        lookup.prefetch(self.col, ["Kiwi", "Apple"])
+        self.assertEqual(lookup.keys, {"Kiwi": 5, "Apple": 1})
+
+        # Same answer as the in-memory index.
+        index = duplicates.DuplicateIndex(10)
+        index.build(self.col, None)
+        self.assertEqual(index.lookup("Kiwi"), 5)
+
+    def test_prefetch_does_not_write(self):
+        # Writes through col.db would clear Anki's undo queue.
+        for checksum in (None, len):
+            duplicates.field_checksum = checksum
+            lookup = duplicates.SqlDuplicateLookup(10, deck_id=1)
+            lookup.prefetch(self.col, ["Apple", "Banana"])
+        self.assertEqual(self.db.writes, [])
+
+    def test_deck_scope_and_excluded_notes(self):
+        duplicates.field_checksum = None
+        lookup = duplicates.SqlDuplicateLookup(10, deck_id=1)
+        lookup.prefetch(self.col, ["Apple", "Banana"])
+        self.assertEqual(lookup.keys, {"Apple": 1})
+
+        lookup.prefetch(self.col, ["Apple"], exclude_nids={1})
+        self.assertIsNone(lookup.lookup("Apple"))
+
+
+if __name__ == "__main__":
+    unittest.main()
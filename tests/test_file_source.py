@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(__file__))
+
+from _helpers import install_anki_stubs, load_addon_module
+
+install_anki_stubs()
+
+detector = load_addon_module("detector")
+file_source = load_addon_module("file_source")
+
+
+class TestFileSource(unittest.TestCase):
+    def setUp(self):
+        file_source.clear_cache()
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, data: bytes):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_utf8_bom_is_stripped(self):
+        path = self._write("bom.csv", b"\xef\xbb\xbfFront,Back\r\n1,2\r\n")
+        source = file_source.open_source(path)
+        self.assertEqual(source.read_text(), "Front,Back\r\n1,2\r\n")
+        self.assertEqual(source.encoding, "utf-8-sig")
+
+    def test_utf16_bom(self):
+        path = self._write("u16.csv", "Front\tBäck\n".encode("utf-16"))
+        self.assertEqual(file_source.read_text(path), "Front\tBäck\n")
+
+    def test_empty_and_missing_files(self):
+        path = self._write("empty.csv", b"")
+        self.assertEqual(file_source.read_text(path), "")
+        self.assertEqual(file_source.read_text(path + ".missing"), "")
+
+    def test_cache_is_keyed_by_mtime_and_size(self):
+        path = self._write("a.csv", b"A,B\n")
+        first = file_source.open_source(path)
+        self.assertIs(file_source.open_source(path), first)
+
+        self._write("a.csv", b"A,B\n1,2\n")
+        second = file_source.open_source(path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.read_text(), "A,B\n1,2\n")
+
+    def test_cached_source_does_not_keep_full_text(self):
+        text = "a,b\n" * (file_source.SAMPLE_SIZE // 2)
+        path = self._write("large.csv", text.encode("utf-8"))
+        source = file_source.open_source(path)
+        self.assertEqual(source.read_text(), text)
+        self.assertEqual(list(source.iter_lines()), list(detector.iter_lines(text)))
+        self.assertIs(file_source.open_source(path), source)
+        kept = [v for v in vars(source).values() if isinstance(v, str)]
+        self.assertTrue(all(len(v) <= file_source.SAMPLE_SIZE for v in kept))
+        self.assertEqual(source.read_prefix(5), text[:5])
+
+        small = file_source.open_source(self._write("small.csv", b"x,y\n"))
+        self.assertEqual(small.read_text(), "x,y\n")
+        self.assertEqual(small.read_prefix(100), "x,y\n")
+
+    def test_read_prefix_and_iter_lines_across_chunks(self):
+        text = "".join(f"row {i},ü\r\n" for i in range(500)) + "last\rline"
+        path = self._write("big.csv", text.encode("utf-8"))
+        source = file_source.open_source(path)
+        self.assertEqual(source.read_prefix(10), text[:10])
+        # Small chunks split lines, "\r\n" pairs and multi-byte characters.
+        lines = list(source.iter_lines(chunk_size=7))
+        self.assertEqual(lines, list(detector.iter_lines(text)))
+
+
+if __name__ == "__main__":
+    unittest.main()
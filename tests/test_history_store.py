@@ -0,0 +1,202 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(__file__))
+
+from _helpers import install_anki_stubs, load_addon_module
+
+install_anki_stubs()
+
+history_store = load_addon_module("history_store")
+
+
+def _batch(*nids):
+    log = history_store.NoteLog()
+    for nid in nids:
+        log.add(nid, f"note {nid}")
+    return {
+        "time": "10:00 AM",
+        "deck_name": "Default",
+        "notetype_name": "Basic",
+        "expanded": False,
+        "added": len(nids),
+        "updated": 0,
+        "nids": log.nids,
+        "previews": log.previews,
+    }
+
+
+def _legacy_batch(*nids):
+    batch = _batch(*nids)
+    del batch["nids"], batch["previews"]
+    batch["cards"] = [{"id": nid, "preview": f"note {nid}"} for nid in nids]
+    return batch
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "user_files", "history.jsonl")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _lines(self):
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def _reopen(self):
+        return history_store.HistoryStore(self.path, persistent=True)
+
+    def test_changes_are_appended_and_replayed(self):
+        store = self._reopen()
+        first = store.add_batch(_batch(1, 2, 3))
+        second = store.add_batch(_batch(4, 5))
+        store.set_expanded(first, True)
+        store.remove_notes({1})
+        store.remove_notes({5})
+        self.assertEqual(
+            [event["op"] for event in self._lines()],
+            ["batch", "batch", "expanded", "remove_notes", "remove_notes"],
+        )
+
+        reloaded = self._reopen().batches()
+        self.assertEqual([b["id"] for b in reloaded], [first, second])
+        self.assertEqual(list(reloaded[0]["nids"]), [2, 3])
+        self.assertEqual(reloaded[0]["previews"], {2: "note 2", 3: "note 3"})
+        self.assertTrue(reloaded[0]["expanded"])
+        self.assertEqual(reloaded[1]["added"], 1)
+
+        store.remove_batch(first)
+        self.assertEqual([b["id"] for b in self._reopen().batches()], [second])
+
+    def test_remove_notes_touches_only_batches_holding_them(self):
+        store = self._reopen()
+        first = store.add_batch(_batch(1, 2))
+        second = store.add_batch(_batch(3, 4))
+        third = store.add_batch(_batch(2, 5))
+        self.assertEqual(store.batch_ids_for([2]), [first, third])
+
+        self.assertEqual(store.remove_notes({1, 2}), [first, third])
+        # The emptied batch is logged as removed, the other note by id.
+        self.assertEqual(
+            [(e["op"], e.get("id"), e.get("nids")) for e in self._lines()[3:]],
+            [("remove", first, None), ("remove_notes", None, [2])],
+        )
+        self.assertIsNone(store.get(first))
+        self.assertEqual(list(store.get(third)["nids"]), [5])
+        self.assertEqual(store.batch_ids_for([1, 2]), [])
+        self.assertEqual([b["id"] for b in self._reopen().batches()], [second, third])
+
+        store.add_batch(_batch(3))
+        self.assertEqual(len(store.batch_ids_for([3])), 2)
+
+    def test_history_is_loaded_lazily(self):
+        self._reopen().add_batch(_batch(1))
+        store = self._reopen()
+        self.assertIsNone(store._batches)
+        self.assertEqual(len(store.batches()), 1)
+
+    def test_clear_and_compaction(self):
+        store = self._reopen()
+        batch_id = store.add_batch(_batch(1))
+        for i in range(history_store.COMPACT_MIN_EVENTS + 1):
+            store.set_expanded(batch_id, i % 2 == 0)
+        self.assertLessEqual(len(self._lines()), history_store.COMPACT_MIN_EVENTS)
+        self.assertEqual(self._reopen().batches()[0]["id"], batch_id)
+
+        store.clear()
+        self.assertEqual(self._lines(), [])
+        self.assertEqual(self._reopen().batches(), [])
+
+    def test_truncated_line_is_skipped(self):
+        self._reopen().add_batch(_batch(1))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"op": "batch", "batch": {"id"')
+        self.assertEqual(len(self._reopen().batches()), 1)
+
+    def test_append_after_truncated_line(self):
+        self._reopen().add_batch(_batch(1))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"op": "batch", "batch": {"id"')
+        store = self._reopen()
+        store.add_batch(_batch(2))
+        self.assertEqual(len(store.batches()), 2)
+        self.assertEqual(len(self._reopen().batches()), 2)
+
+    def test_migrate_legacy_config_history(self):
+        store = self._reopen()
+        legacy = _legacy_batch(2, 3)
+        legacy["cards"].append("preview without a note id")
+        store.migrate([_legacy_batch(1), legacy])
+        reloaded = self._reopen().batches()
+        self.assertEqual(len(reloaded), 2)
+        self.assertTrue(all(b.get("id") for b in reloaded))
+        self.assertEqual(list(reloaded[1]["nids"]), [2, 3])
+        self.assertEqual(reloaded[1]["added"], 2)
+        self.assertNotIn("cards", reloaded[1])
+
+    def test_browser_search_prefers_batch_tags(self):
+        tagged = _batch(1, 2)
+        tagged["tag"] = history_store.batch_tag("abcdef123456")
+        untagged = _batch(3, 4)
+        query = history_store.browser_search([tagged, untagged], {9})
+        self.assertEqual(query, f"tag:{tagged['tag']} or nid:3,4,9")
+        self.assertTrue(tagged["tag"].startswith("CSVImportPlus::"))
+        self.assertTrue(tagged["tag"].endswith("-abcdef"))
+        self.assertNotIn("_", tagged["tag"])
+        self.assertEqual(history_store.browser_search([], set()), "")
+
+    def test_note_log_keeps_bounded_previews(self):
+        log = history_store.NoteLog()
+        for nid in range(history_store.PREVIEW_SAMPLE + 10):
+            log.add(nid, "x" * (history_store.PREVIEW_CHARS * 2))
+        self.assertEqual(len(log.nids), history_store.PREVIEW_SAMPLE + 10)
+        self.assertEqual(log.nids.typecode, "q")
+        self.assertEqual(len(log.previews), history_store.PREVIEW_SAMPLE)
+        self.assertTrue(all(len(p) == history_store.PREVIEW_CHARS + 1 for p in log.previews.values()))
+
+    def test_previews_are_only_marked_when_cut(self):
+        exact = "x" * history_store.PREVIEW_CHARS
+        longer = exact + "yz"
+        log = history_store.NoteLog()
+        log.add(1, exact)
+        log.add(2, longer)
+        self.assertEqual(history_store.format_preview(log.previews[1]), exact)
+        self.assertEqual(history_store.format_preview(log.previews[2]), exact + "...")
+
+    def test_fetch_previews_reads_first_fields(self):
+        import types
+        from aqt import mw
+
+        queries = []
+
+        def all_rows(sql, *args):
+            queries.append(sql)
+            return [(1, "front one\x1fback"), (2, "front two\x1fback")]
+
+        old_col = mw.col
+        mw.col = types.SimpleNamespace(db=types.SimpleNamespace(all=all_rows))
+        try:
+            previews = history_store.fetch_previews([1, 2, 3])
+        finally:
+            mw.col = old_col
+        self.assertEqual(previews, {1: "front one", 2: "front two"})
+        self.assertIn("1,2,3", queries[0])
+
+    def test_not_persistent_keeps_session_history_only(self):
+        store = history_store.HistoryStore(self.path)
+        store.add_batch(_batch(1))
+        self.assertFalse(os.path.exists(self.path))
+
+        store.set_persistent(True)
+        self.assertEqual(len(self._reopen().batches()), 1)
+        store.set_persistent(False)
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,7 +29,81 @@ class _DummyCombo:
         self._index = index
 
 
+def _install_mock_collection(events=None):
+    from aqt import mw
+    import types
+
+    class MockNote:
+        def __init__(self, notetype):
+            self.fields = [""] * len(notetype["flds"])
+            self.tags = []
+            self.id = 1
+            self.mid = 1
+
+    class MockModels:
+        def get(self, mid):
+            return {"id": 1, "name": "Basic", "flds": [{"name": "Front"}, {"name": "Back"}]}
+
+    events = events if events is not None else []
+    added_notes = []
+
+    def new_note(notetype):
+        events.append("new")
+        return MockNote(notetype)
+
+    def add_note(note, deck_id):
+        events.append("add")
+        added_notes.append(note)
+        return 1
+
+    mw.col = types.SimpleNamespace(
+        models=MockModels(),
+        decks=types.SimpleNamespace(select=lambda did: None),
+        db=types.SimpleNamespace(all=lambda *args, **kwargs: []),
+        new_note=new_note,
+        add_note=add_note,
+    )
+    mw.checkpoint = lambda *args, **kwargs: None
+    mw.progress = types.SimpleNamespace(start=lambda: None, finish=lambda: None)
+    mw.reset = lambda: None
+    return added_notes
+
+
 class TestImporter(unittest.TestCase):
+    def test_import_plan_mapped_columns(self):
+        plan = importer.ImportPlan(
+            ["Front", "Back", "Extra"], {"Front": 2, "Back": 0, "Extra": None, "Tags": 1}, False
+        )
+        self.assertEqual([(c, f) for c, f, _ in plan.columns], [(2, 0), (0, 1)])
+        key, fields, tags = plan.prepare(["b <i>\n", "t1 t2", " front "])
+        self.assertEqual(key, "front")
+        self.assertEqual(fields, [(0, "front"), (1, "b &lt;i&gt;")])
+        self.assertEqual(tags, ["t1", "t2"])
+        self.assertIsNone(plan.prepare(["", " "]))
+
+    def test_import_plan_prepare_batch_matches_per_row(self):
+        rows = [
+            ["a & b", "x\r\ny", "t1"],
+            [],
+            ["  ", ""],
+            ["<c>", "has\x1fsep"],
+            ["solo"],
+            ["d", "e\nf", "t2 t3", "extra"],
+        ]
+        for mapping in (None, {"Front": 1, "Back": 0, "Tags": 2}):
+            for allow_html in (True, False):
+                plan = importer.ImportPlan(["Front", "Back"], mapping, allow_html)
+                self.assertEqual(
+                    plan.prepare_batch(rows), [plan.prepare(r) for r in rows]
+                )
+
+    def test_import_plan_positional_without_valid_mapping(self):
+        plan = importer.ImportPlan(["Front", "Back"], {"Front": None}, True)
+        self.assertFalse(plan.mapped)
+        self.assertEqual(plan.prepare(["<b>a</b>", "x\r\ny", "tag"]),
+                         ("<b>a</b>", [(0, "<b>a</b>"), (1, "x<br>y")], ["tag"]))
+        self.assertEqual(plan.prepare(["a"]), ("a", [(0, "a")], []))
+
     def test_get_delimiter_auto(self):
         combo = _DummyCombo("Auto-detect", 0)
         delim = importer.get_delimiter(combo, "A\tB\n1\t2")
@@ -129,6 +203,249 @@ class TestImporter(unittest.TestCase):
         self.assertEqual(added_notes[0].fields[1], "Back <with> HTML")
         self.assertEqual(added_notes[0].tags, ["tag1", "tag2"])
 
+    def test_do_import_streams_in_batches(self):
+        import types
+
+        events = []
+        added_notes = _install_mock_collection(events)
+        raw_csv = "#notetype:Basic\nFront,Back\nA,1\nB,2\n\nC,3\nD,4\n"
+        res = importer.do_import(
+            raw_csv,
+            _DummyCombo("Default", 0),
+            [types.SimpleNamespace(name="Default", id=1)],
+            _DummyCombo("Basic", 0),
+            [types.SimpleNamespace(name="Basic", id=1)],
+            types.SimpleNamespace(isChecked=lambda: True),
+            _DummyCombo("Comma (,)", 1),
+            batch_size=2,
+        )
+        self.assertEqual(res["added"], 4)
+        self.assertEqual(res["skipped_empty"], 1)
+        self.assertEqual([n.fields[0] for n in added_notes], ["A", "B", "C", "D"])
+        # Each batch is written before the next one is built.
+        self.assertEqual(
+            events, ["new", "new", "add", "add", "new", "add", "new", "add"]
+        )
+
+    def test_run_import_job_streams_file_source(self):
+        import tempfile
+        import types
+
+        file_source = load_addon_module("file_source")
+        added_notes = _install_mock_collection()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cards.csv")
+            with open(path, "wb") as f:
+                f.write(b"\xef\xbb\xbf#notetype:Basic\r\nA;1\r\nB;2\r\n")
+            job = importer.prepare_import(
+                file_source.open_source(path),
+                _DummyCombo("Default", 0),
+                [types.SimpleNamespace(name="Default", id=1)],
+                _DummyCombo("Basic", 0),
+                [types.SimpleNamespace(name="Basic", id=1)],
+                types.SimpleNamespace(isChecked=lambda: False),
+                _DummyCombo("Auto-detect", 0),
+            )
+            result = importer.run_import_job(job)
+        self.assertEqual(job["delimiter"], ";")
+        self.assertEqual(result["added"], 2)
+        self.assertEqual([n.fields for n in added_notes], [["A", "1"], ["B", "2"]])
+
+    def test_run_import_job_cancel_rolls_back(self):
+        from aqt import mw
+        import types
+
+        events = []
+        _install_mock_collection(events)
+        mw.col.add_custom_undo_entry = lambda name: events.append("undo-entry") or 7
+        mw.col.merge_undo_entries = lambda entry: events.append(f"merge-{entry}")
+        mw.col.undo = lambda: events.append("undo")
+
+        job = importer.prepare_import(
+            "A,1\nB,2\nC,3",
+            _DummyCombo("Default", 0),
+            [types.SimpleNamespace(name="Default", id=1)],
+            _DummyCombo("Basic", 0),
+            [types.SimpleNamespace(name="Basic", id=1)],
+            types.SimpleNamespace(isChecked=lambda: False),
+            _DummyCombo("Comma (,)", 1),
+            batch_size=1,
+        )
+        progress = []
+
+        def on_progress(rows_done):
+            progress.append(rows_done)
+
+        with self.assertRaises(importer.ImportCancelled):
+            importer.run_import_job(
+                job, progress=on_progress, is_cancelled=lambda: len(progress) >= 2
+            )
+        self.assertEqual(progress, [1, 2])
+        self.assertEqual(events[-2:], ["merge-7", "undo"])
+        self.assertEqual(events.count("undo-entry"), 1)
+
+    def test_run_import_job_failure_rolls_back(self):
+        from aqt import mw
+        import types
+
+        events = []
+        _install_mock_collection(events)
+        mw.col.add_custom_undo_entry = lambda name: events.append("undo-entry") or 7
+        mw.col.merge_undo_entries = lambda entry: events.append(f"merge-{entry}")
+        mw.col.undo = lambda: events.append("undo")
+
+        job = importer.prepare_import(
+            "A,1\nB,2\nC,3",
+            _DummyCombo("Default", 0),
+            [types.SimpleNamespace(name="Default", id=1)],
+            _DummyCombo("Basic", 0),
+            [types.SimpleNamespace(name="Basic", id=1)],
+            types.SimpleNamespace(isChecked=lambda: False),
+            _DummyCombo("Comma (,)", 1),
+            batch_size=1,
+        )
+
+        def on_progress(rows_done):
+            if rows_done == 2:
+                raise RuntimeError("disk full")
+
+        with self.assertRaises(RuntimeError):
+            importer.run_import_job(job, progress=on_progress)
+        self.assertEqual(events[-2:], ["merge-7", "undo"])
+
+    def test_cancel_leaves_foreign_undo_steps_alone(self):
+        from aqt import mw
+        import types
+
+        events = []
+        added_notes = _install_mock_collection(events)
+        steps = {"last": 7}
+        mw.col.add_custom_undo_entry = lambda name: events.append("undo-entry") or 7
+        mw.col.merge_undo_entries = lambda entry: events.append(f"merge-{entry}")
+        mw.col.undo_status = lambda: types.SimpleNamespace(last_step=steps["last"])
+        mw.col.undo = lambda: events.append("undo")
+        mw.col.remove_notes = lambda nids: events.append(("remove", sorted(nids)))
+
+        job = importer.prepare_import(
+            "A,1\nB,2\nC,3",
+            _DummyCombo("Default", 0),
+            [types.SimpleNamespace(name="Default", id=1)],
+            _DummyCombo("Basic", 0),
+            [types.SimpleNamespace(name="Basic", id=1)],
+            types.SimpleNamespace(isChecked=lambda: False),
+            _DummyCombo("Comma (,)", 1),
+            batch_size=1,
+        )
+        progress = []
+
+        def on_progress(rows_done):
+            progress.append(rows_done)
+            # The user does something undoable while the import runs.
+            steps["last"] = 8
+
+        with self.assertRaises(importer.ImportCancelled):
+            importer.run_import_job(
+                job, progress=on_progress, is_cancelled=lambda: len(progress) >= 2
+            )
+        # Only the first batch was merged, and nothing was undone.
+        self.assertEqual(events.count("merge-7"), 1)
+        self.assertNotIn("undo", events)
+        self.assertEqual(events[-1], ("remove", sorted(n.id for n in added_notes)))
+
+    def test_do_import_uses_batched_add_notes(self):
+        from aqt import mw
+        import types
+
+        _install_mock_collection()
+        calls = []
+
+        def add_notes(requests):
+            calls.append([r.note.fields[0] for r in requests])
+            for i, r in enumerate(requests):
+                r.note.id = 100 + len(calls) * 10 + i
+
+        mw.col.add_notes = add_notes
+        old_request = importer.AddNoteRequest
+        importer.AddNoteRequest = lambda note, deck_id: types.SimpleNamespace(
+            note=note, deck_id=deck_id
+        )
+        try:
+            res = importer.do_import(
+                "A,1\nB,2\nC,3",
+                _DummyCombo("Default", 0),
+                [types.SimpleNamespace(name="Default", id=1)],
+                _DummyCombo("Basic", 0),
+                [types.SimpleNamespace(name="Basic", id=1)],
+                types.SimpleNamespace(isChecked=lambda: False),
+                _DummyCombo("Comma (,)", 1),
+                batch_size=2,
+            )
+        finally:
+            importer.AddNoteRequest = old_request
+        self.assertEqual(res["added"], 3)
+        self.assertEqual(calls, [["A", "B"], ["C"]])
+        card_ids = list(importer.history_store.get_store().batches()[-1]["nids"])
+        self.assertEqual(card_ids, [110, 111, 120])
+
+    def test_batch_tag_is_applied_and_recorded(self):
+        from aqt import mw
+        import types
+
+        _install_mock_collection()
+        tags = []
+
+        def add_notes(requests):
+            for i, r in enumerate(requests):
+                r.note.id = 200 + i
+                tags.append(list(r.note.tags))
+
+        mw.col.add_notes = add_notes
+        old_request = importer.AddNoteRequest
+        importer.AddNoteRequest = lambda note, deck_id: types.SimpleNamespace(
+            note=note, deck_id=deck_id
+        )
+        try:
+            importer.do_import(
+                "A,1\nB,2",
+                _DummyCombo("Default", 0),
+                [types.SimpleNamespace(name="Default", id=1)],
+                _DummyCombo("Basic", 0),
+                [types.SimpleNamespace(name="Basic", id=1)],
+                types.SimpleNamespace(isChecked=lambda: False),
+                _DummyCombo("Comma (,)", 1),
+                tag_all="mine",
+                batch_tag=True,
+            )
+        finally:
+            importer.AddNoteRequest = old_request
+        batch = importer.history_store.get_store().batches()[-1]
+        self.assertTrue(batch["tag"].startswith("CSVImportPlus::"))
+        self.assertTrue(batch["tag"].endswith(batch["id"][:6]))
+        self.assertEqual(tags, [["mine", batch["tag"]], ["mine", batch["tag"]]])
+
+
+class TestRemoveNotes(unittest.TestCase):
+    def test_single_call_in_one_undo_entry(self):
+        import types
+        from aqt import mw
+
+        events = []
+        old_col = mw.col
+        mw.col = types.SimpleNamespace(
+            add_custom_undo_entry=lambda label: events.append(("undo", label)) or 7,
+            merge_undo_entries=lambda entry: events.append(("merge", entry)),
+            remove_notes=lambda nids: events.append(("remove", sorted(nids))),
+        )
+        try:
+            self.assertTrue(importer.remove_notes({3, 1, 2}))
+            self.assertFalse(importer.remove_notes([]))
+        finally:
+            mw.col = old_col
+        self.assertEqual(
+            events,
+            [("undo", "Delete Imported Notes"), ("remove", [1, 2, 3]), ("merge", 7)],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(__file__))
+
+from _helpers import install_anki_stubs, load_addon_module
+
+install_anki_stubs()
+
+detector = load_addon_module("detector")
+parsers = load_addon_module("parsers")
+
+# (text, delimiter, expected rows). Every backend must produce these rows.
+CONFORMANCE_CASES = [
+    ("a,b\n1,2\n", ",", [["a", "b"], ["1", "2"]]),
+    ("a;b\r\n1;2", ";", [["a", "b"], ["1", "2"]]),
+    ('"x, y",z\n', ",", [["x, y", "z"]]),
+    ('"say ""hi""",2\n', ",", [['say "hi"', "2"]]),
+    ('"line one\nline two",b\nc,d\n', ",", [["line one\nline two", "b"], ["c", "d"]]),
+    ("a\tb\n\tc\n", "\t", [["a", "b"], ["", "c"]]),
+    ("a|b|c\n1|2\n", "|", [["a", "b", "c"], ["1", "2"]]),
+    ("a,b\n\nc,d\n", ",", [["a", "b"], [], ["c", "d"]]),
+    ("only\n", ",", [["only"]]),
+    ("one\n\ntwo\n", ",", [["one"], [], ["two"]]),
+    ('"a\n\nb",c\n', ",", [["a\n\nb", "c"]]),
+    ("a,b\n,\n", ",", [["a", "b"], ["", ""]]),
+    (' a , "b" \n', ",", [[" a ", ' "b" ']]),
+    ("007,1e3,NA,null\n", ",", [["007", "1e3", "NA", "null"]]),
+    ("ü,€\n", ",", [["ü", "€"]]),
+    ("", ",", []),
+]
+
+
+class TestParserConformance(unittest.TestCase):
+    def test_backends_agree_with_stdlib_dialect(self):
+        backends = parsers.available_backends()
+        self.assertIn(parsers.StdlibParser, backends)
+        for backend in backends:
+            parser = backend()
+            for text, delimiter, expected in CONFORMANCE_CASES:
+                with self.subTest(backend=backend.name, text=text):
+                    rows = parser.iter_rows(detector.iter_lines(text), delimiter)
+                    self.assertEqual([list(row) for row in rows], expected)
+
+    def test_backends_count_rows_like_stdlib(self):
+        texts = [case[0] for case in CONFORMANCE_CASES] + [
+            "a,b\r1,2\r\n\r\n3,4",
+            "x\n\"q\nq\",z\n",
+        ]
+        parsers_to_check = [backend() for backend in parsers.available_backends()]
+        parsers_to_check.append(parsers.AutoParser())
+        for parser in parsers_to_check:
+            for text in texts:
+                with self.subTest(backend=parser.name, text=text):
+                    expected = sum(
+                        1 for _ in parsers.StdlibParser().iter_rows(detector.iter_lines(text), ",")
+                    )
+                    self.assertEqual(
+                        parser.count_rows(detector.iter_lines(text), ",", text=text), expected
+                    )
+                    self.assertEqual(
+                        parser.count_rows(detector.iter_lines(text), ","), expected
+                    )
+
+    def test_backend_selection(self):
+        try:
+            parsers.set_backend("stdlib")
+            self.assertIsInstance(parsers.get_parser(), parsers.StdlibParser)
+            parsers.set_backend("no-such-parser")
+            self.assertIsInstance(parsers.get_parser(), parsers.StdlibParser)
+            parsers.set_backend(parsers.BACKEND_AUTO)
+            self.assertIsInstance(parsers.get_parser(), parsers.AutoParser)
+        finally:
+            parsers.set_backend(parsers.BACKEND_AUTO)
+
+
+if __name__ == "__main__":
+    unittest.main()